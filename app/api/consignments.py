@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional, Union
+from datetime import datetime
 from app.models.consignment import (
     ConsignmentCreate, ConsignmentUpdate, ConsignmentResponse,
-    ConsignmentStatus, ConsignmentStatusUpdate
+    ConsignmentStatus, ConsignmentStatusUpdate,
+    ConsignmentBulkCreate, ConsignmentBulkResponse,
+    ConsignmentStatusBatch, ConsignmentStatusBatchResponse,
+    TrackingBatchRequest, TrackingBatchResponse, ConsignmentSearchResponse
 )
-from app.models.base import BaseResponse, PaginatedResponse
-from app.services.consignment_service import ConsignmentService
+from app.models.base import BaseResponse, PaginatedResponse, CursorPaginatedResponse
+from app.services.consignment_service import ConsignmentService, EXPORT_COLUMNS
 from app.middleware.auth_middleware import get_current_user
+from app.core.utils import csv_stream, etag_matches, ndjson_stream, start_stream
+from app.core.serialization import RecordJSONResponse
+from app.services.notification_service import event_stream, public_event, status_feed
+from app.config import settings
+from app.database import use_statement_class
 
-router = APIRouter(prefix="/consignments", tags=["Consignments"])
+router = APIRouter(
+    prefix="/consignments",
+    tags=["Consignments"],
+    dependencies=[Depends(use_statement_class("interactive"))]
+)
 
 
 @router.post("/", response_model=ConsignmentResponse)
@@ -20,12 +34,25 @@ async def create_consignment(
     return await ConsignmentService.create_consignment(consignment)
 
 
-@router.get("/", response_model=PaginatedResponse)
+@router.post("/bulk", response_model=ConsignmentBulkResponse)
+async def create_consignments_bulk(
+        batch: ConsignmentBulkCreate,
+        current_user: dict = Depends(get_current_user)
+):
+    """Create a batch of consignments in one transaction"""
+    return await ConsignmentService.create_consignments_bulk(batch.items)
+
+
+@router.get("/", response_model=Union[PaginatedResponse, CursorPaginatedResponse])
 async def get_consignments(
         warehouse_id: Optional[str] = Query(None),
         status: Optional[ConsignmentStatus] = Query(None),
         page: int = Query(1, ge=1),
         page_size: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value for the first page"),
+        include_total: bool = Query(False, description="Include a (cached) total in cursor mode"),
+        created_from: Optional[datetime] = Query(None),
+        created_to: Optional[datetime] = Query(None),
         current_user: dict = Depends(get_current_user)
 ):
     """Get paginated consignments with filters"""
@@ -33,7 +60,67 @@ async def get_consignments(
     if current_user["role"] not in ["admin", "manager"] and not warehouse_id:
         warehouse_id = current_user["warehouse_id"]
 
-    return await ConsignmentService.get_consignments(warehouse_id, status, page, page_size)
+    if cursor is not None:
+        page_data = await ConsignmentService.get_consignments_after(
+            warehouse_id, status, cursor, page_size, include_total, created_from, created_to
+        )
+    else:
+        page_data = await ConsignmentService.get_consignments(
+            warehouse_id, status, page, page_size, created_from, created_to
+        )
+
+    # Rows come straight from the database; skip response_model re-validation
+    return RecordJSONResponse(page_data)
+
+
+@router.get("/search", response_model=ConsignmentSearchResponse)
+async def search_consignments(
+        q: str = Query(..., min_length=2, max_length=100),
+        warehouse_id: Optional[str] = Query(None),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=100),
+        current_user: dict = Depends(get_current_user)
+):
+    """Search consignments by sender/receiver name, phone or address"""
+    # Staff outside admin/manager only ever search their own warehouse
+    if current_user["role"] not in ["admin", "manager"]:
+        warehouse_id = current_user["warehouse_id"]
+
+    return RecordJSONResponse(
+        await ConsignmentService.search_consignments(q, warehouse_id, page, page_size)
+    )
+
+
+@router.get("/export", dependencies=[Depends(use_statement_class("export"))])
+async def export_consignments(
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        warehouse_id: Optional[str] = Query(None),
+        status: Optional[ConsignmentStatus] = Query(None),
+        created_from: Optional[datetime] = Query(None),
+        created_to: Optional[datetime] = Query(None),
+        current_user: dict = Depends(get_current_user)
+):
+    """Stream all matching consignments as CSV or NDJSON"""
+    # Staff outside admin/manager only ever export their own warehouse
+    if current_user["role"] not in ["admin", "manager"]:
+        warehouse_id = current_user["warehouse_id"]
+
+    rows = await start_stream(
+        ConsignmentService.stream_consignments(warehouse_id, status, created_from, created_to)
+    )
+
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_stream(rows),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=consignments.ndjson"}
+        )
+
+    return StreamingResponse(
+        csv_stream(rows, EXPORT_COLUMNS),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=consignments.csv"}
+    )
 
 
 @router.get("/{consignment_id}", response_model=ConsignmentResponse)
@@ -49,14 +136,67 @@ async def get_consignment(
 
 
 @router.get("/tracking/{tracking_number}", response_model=ConsignmentResponse)
-async def track_consignment(tracking_number: str):
+async def track_consignment(tracking_number: str, request: Request, response: Response):
     """Track consignment by tracking number (public endpoint)"""
+    cache_control = f"public, max-age={settings.tracking_max_age_seconds}"
+
     consignment = await ConsignmentService.get_consignment_by_tracking(tracking_number)
     if not consignment:
-        raise HTTPException(status_code=404, detail="Consignment not found")
+        raise HTTPException(
+            status_code=404,
+            detail="Consignment not found",
+            headers={"Cache-Control": cache_control}
+        )
+
+    etag = ConsignmentService.tracking_etag(consignment)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
     return consignment
 
 
+@router.get("/tracking/{tracking_number}/events")
+async def subscribe_tracking(tracking_number: str):
+    """Stream status changes for one consignment as Server-Sent Events (public endpoint)"""
+    # Unauthenticated and long-lived, so bound how many a worker holds open
+    if status_feed.tracking_subscribers() >= settings.live_feed_max_tracking_subscribers:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many open tracking subscriptions, please retry",
+            headers={"Retry-After": str(settings.live_feed_reconnect_seconds)}
+        )
+
+    consignment = await ConsignmentService.get_consignment_by_tracking(tracking_number)
+    if not consignment:
+        raise HTTPException(status_code=404, detail="Consignment not found")
+
+    # Current state first, so clients need no separate lookup before listening
+    snapshot = public_event(
+        consignment.tracking_number,
+        consignment.status.value,
+        consignment.updated_at.isoformat() if consignment.updated_at else None
+    )
+
+    return StreamingResponse(
+        event_stream(("tracking", tracking_number), snapshot=snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/tracking/batch", response_model=TrackingBatchResponse)
+async def track_consignments_batch(
+        batch: TrackingBatchRequest,
+        current_user: dict = Depends(get_current_user)
+):
+    """Track many consignments at once (authenticated partners)"""
+    return await ConsignmentService.get_consignments_by_tracking(
+        batch.tracking_numbers, batch.updated_since
+    )
+
+
 @router.put("/{consignment_id}/status", response_model=ConsignmentResponse)
 async def update_consignment_status(
         consignment_id: str,
@@ -69,4 +209,15 @@ async def update_consignment_status(
     )
     if not updated_consignment:
         raise HTTPException(status_code=404, detail="Consignment not found")
-    return updated_consignment
\ No newline at end of file
+    return updated_consignment
+
+
+@router.post("/status/batch", response_model=ConsignmentStatusBatchResponse)
+async def update_consignment_statuses_batch(
+        batch: ConsignmentStatusBatch,
+        current_user: dict = Depends(get_current_user)
+):
+    """Apply a batch of scan-event status updates in one transaction"""
+    return await ConsignmentService.update_consignment_statuses_batch(
+        batch.items, current_user["id"]
+    )
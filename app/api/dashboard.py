@@ -1,10 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from datetime import datetime, timedelta
 from app.services.dashboard_service import DashboardService
+from app.services.notification_service import event_stream
 from app.middleware.auth_middleware import get_current_user
+from app.core.serialization import RecordJSONResponse
+from app.database import use_statement_class
 
-router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["Dashboard"],
+    dependencies=[Depends(use_statement_class("dashboard"))]
+)
 
 
 @router.get("/stats")
@@ -17,7 +25,21 @@ async def get_dashboard_stats(
     if current_user["role"] not in ["admin", "manager"]:
         warehouse_id = current_user["warehouse_id"]
 
-    return await DashboardService.get_dashboard_stats(warehouse_id)
+    return RecordJSONResponse(await DashboardService.get_dashboard_stats(warehouse_id))
+
+
+@router.get("/overview")
+async def get_dashboard_overview(
+        warehouse_id: Optional[str] = Query(None),
+        days: int = Query(30, ge=1, le=365),
+        limit: int = Query(10, ge=1, le=50),
+        current_user: dict = Depends(get_current_user)
+):
+    """Get every dashboard panel in a single response"""
+    if current_user["role"] not in ["admin", "manager"]:
+        warehouse_id = current_user["warehouse_id"]
+
+    return RecordJSONResponse(await DashboardService.get_overview(warehouse_id, days, limit))
 
 
 @router.get("/consignments-by-status")
@@ -30,7 +52,7 @@ async def get_consignments_by_status(
     if current_user["role"] not in ["admin", "manager"]:
         warehouse_id = current_user["warehouse_id"]
 
-    return await DashboardService.get_consignments_by_status(warehouse_id, days)
+    return RecordJSONResponse(await DashboardService.get_consignments_by_status(warehouse_id, days))
 
 
 @router.get("/recent-activities")
@@ -43,7 +65,23 @@ async def get_recent_activities(
     if current_user["role"] not in ["admin", "manager"]:
         warehouse_id = current_user["warehouse_id"]
 
-    return await DashboardService.get_recent_activities(warehouse_id, limit)
+    return RecordJSONResponse(await DashboardService.get_recent_activities(warehouse_id, limit))
+
+
+@router.get("/live")
+async def stream_live_activities(
+        warehouse_id: Optional[str] = Query(None),
+        current_user: dict = Depends(get_current_user)
+):
+    """Stream status changes as Server-Sent Events instead of polling recent activities"""
+    if current_user["role"] not in ["admin", "manager"]:
+        warehouse_id = current_user["warehouse_id"]
+
+    return StreamingResponse(
+        event_stream(("warehouse", warehouse_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/performance-metrics")
@@ -56,7 +94,7 @@ async def get_performance_metrics(
     if current_user["role"] not in ["admin", "manager"]:
         warehouse_id = current_user["warehouse_id"]
 
-    return await DashboardService.get_performance_metrics(warehouse_id, days)
+    return RecordJSONResponse(await DashboardService.get_performance_metrics(warehouse_id, days))
 
 
 @router.get("/delivery-trends")
@@ -69,4 +107,4 @@ async def get_delivery_trends(
     if current_user["role"] not in ["admin", "manager"]:
         warehouse_id = current_user["warehouse_id"]
 
-    return await DashboardService.get_delivery_trends(warehouse_id, days)
\ No newline at end of file
+    return RecordJSONResponse(await DashboardService.get_delivery_trends(warehouse_id, days))
\ No newline at end of file
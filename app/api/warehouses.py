@@ -4,8 +4,14 @@ from app.models.warehouse import WarehouseCreate, WarehouseUpdate, WarehouseResp
 from app.models.base import BaseResponse, PaginatedResponse
 from app.services.warehouse_service import WarehouseService
 from app.middleware.auth_middleware import get_current_user
+from app.core.serialization import RecordJSONResponse
+from app.database import use_statement_class
 
-router = APIRouter(prefix="/warehouses", tags=["Warehouses"])
+router = APIRouter(
+    prefix="/warehouses",
+    tags=["Warehouses"],
+    dependencies=[Depends(use_statement_class("interactive"))]
+)
 
 
 @router.post("/", response_model=WarehouseResponse)
@@ -27,7 +33,7 @@ async def get_warehouses(
         current_user: dict = Depends(get_current_user)
 ):
     """Get paginated list of warehouses"""
-    return await WarehouseService.get_warehouses(page, page_size)
+    return RecordJSONResponse(await WarehouseService.get_warehouses(page, page_size))
 
 
 @router.get("/{warehouse_id}", response_model=WarehouseResponse)
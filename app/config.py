@@ -1,28 +1,91 @@
 import os
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
     # Database
     database_url: str
+    # Optional streaming replica for dashboard, listing and tracking reads
+    database_replica_url: Optional[str] = None
+
+    # Connection pools (primary and replica)
+    db_pool_min_size: int = 5
+    db_pool_max_size: int = 20
+    db_pool_acquire_timeout_seconds: float = 2.0
+    db_statement_cache_size: int = 100
+    db_command_timeout_seconds: float = 60
+    db_retry_after_seconds: int = 2
+    status_lock_retry_seconds: float = 0.2
+
+    # Statement timeouts by endpoint class; 0 disables
+    statement_timeout_interactive_ms: int = 5000
+    statement_timeout_dashboard_ms: int = 15000
+    statement_timeout_export_ms: int = 300000
+
+    # Dashboard
+    dashboard_overview_concurrency: int = 3
+    dashboard_cache_max_size: int = 1024
+    dashboard_cache_ttl_seconds: int = 15
+    dashboard_cache_stale_seconds: int = 60
+    # Nightly rollup drift correction window; full rebuilds are manual
+    rollup_reconcile_days: int = 7
+
+    # Live status feed (LISTEN/NOTIFY -> SSE)
+    live_feed_queue_size: int = 100
+    live_feed_heartbeat_seconds: int = 15
+    live_feed_reconnect_seconds: int = 5
+    live_feed_max_tracking_subscribers: int = 2000
+
+    # Query instrumentation
+    slow_query_ms: int = 500
+    server_timing_log_sample_rate: float = 0.0
 
     # Supabase
     supabase_url: str
     supabase_key: str
+    supabase_max_workers: int = 16
 
     # JWT
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
+    # Principal cache
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_size: int = 10000
+
     # App settings
     app_name: str = "Logistics Management System"
     debug: bool = False
 
+    # Server
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_workers: int = os.cpu_count() or 1
+    scheduler_leader_retry_seconds: int = 30
+
     # Pagination
     default_page_size: int = 20
     max_page_size: int = 100
+    count_cache_ttl_seconds: int = 30
+
+    # Public tracking cache
+    tracking_cache_max_size: int = 50000
+    tracking_cache_ttl_seconds: int = 60
+    tracking_negative_cache_ttl_seconds: int = 30
+    tracking_max_age_seconds: int = 30
+
+    # Archiving
+    archive_retention_days: int = 180
+    archive_batch_size: int = 1000
+    archive_batch_pause_seconds: float = 0.1
+    archive_max_runtime_seconds: int = 3600
+
+    # Partitioning
+    partition_months_ahead: int = 3
+    partition_lock_timeout_ms: int = 5000
 
     class Config:
         env_file = ".env"
@@ -4,10 +4,17 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.config import settings
-from app.database import supabase
+from app.database import supabase, run_supabase
+from app.core.cache import TTLCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Resolved user rows keyed by token subject (email)
+principal_cache = TTLCache(
+    max_size=settings.principal_cache_max_size,
+    ttl=settings.principal_cache_ttl_seconds
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -38,16 +45,24 @@ def decode_token(token: str):
 
 async def authenticate_user(email: str, password: str):
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await run_supabase(supabase.auth.sign_in_with_password, {
             "email": email,
             "password": password
         })
 
         if response.user:
-            user_data = supabase.table("user_management").select("*").eq("email", email).execute()
+            user_data = await run_supabase(supabase.table("user_management").select("*").eq("email", email).execute)
             if user_data.data:
                 return user_data.data[0]
         return None
     except Exception as e:
         print(f"Authentication error: {e}")
         return None
+
+
+def invalidate_principal(user_id: Optional[str] = None, email: Optional[str] = None):
+    """Drop cached principals so user changes take effect immediately"""
+    if email:
+        principal_cache.invalidate(email)
+    if user_id:
+        principal_cache.invalidate_where(lambda user: user.get("id") == user_id)
@@ -0,0 +1,204 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry expiry and LRU eviction"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # When each key (or, via _cleared_at, every key) was last invalidated;
+        # kept for one TTL so loads racing an invalidation can be detected
+        self._invalidated_at: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._cleared_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value or default if missing/expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, loaded_since: Optional[float] = None):
+        """Store value, evicting the least recently used entry when full.
+
+        Pass loaded_since (time.monotonic() taken before reading the source)
+        to skip the write when key was invalidated while the read was in flight.
+        """
+        if self.max_size <= 0:
+            return
+        if loaded_since is not None and self._invalidated_since(key, loaded_since):
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _invalidated_since(self, key: Hashable, since: float) -> bool:
+        return self._cleared_at >= since or self._invalidated_at.get(key, float("-inf")) >= since
+
+    def _mark_invalidated(self, key: Hashable):
+        now = time.monotonic()
+        self._invalidated_at[key] = now
+        self._invalidated_at.move_to_end(key)
+        # A load older than one TTL is not worth caching anyway
+        while self._invalidated_at:
+            oldest_key, invalidated_at = next(iter(self._invalidated_at.items()))
+            if invalidated_at > now - self.ttl:
+                break
+            del self._invalidated_at[oldest_key]
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry"""
+        self._mark_invalidated(key)
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+            return True
+        return False
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches predicate"""
+        # Matching keys may still be loading, so fence off every in-flight load
+        self._cleared_at = time.monotonic()
+        stale = [key for key, (value, _) in self._entries.items() if predicate(value)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Drop all entries"""
+        self._cleared_at = time.monotonic()
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+class SingleFlightCache:
+    """Async result cache with request coalescing and stale-while-revalidate.
+
+    Concurrent misses for one key share a single load. Once an entry passes its
+    TTL it is still served for stale_ttl more seconds while one background load
+    refreshes it.
+    """
+
+    def __init__(self, max_size: int, ttl: float, stale_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # key -> (value, fresh_until, stale_until)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.load_errors = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for key, calling loader at most once per key at a time"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if now < stale_until:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start(key, loader)
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start(key, loader)
+
+        # Shielded so one caller going away doesn't cancel the load for the rest
+        return await asyncio.shield(task)
+
+    def _start(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, loader))
+        task.add_done_callback(self._loaded)
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        finally:
+            self._inflight.pop(key, None)
+
+        now = time.monotonic()
+        self._entries[key] = (value, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def _loaded(self, task: asyncio.Task):
+        # Retrieve the exception so background refresh failures aren't reported as unhandled
+        if not task.cancelled() and task.exception() is not None:
+            self.load_errors += 1
+
+    def clear(self):
+        """Drop all entries; in-flight loads still complete"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "load_errors": self.load_errors
+        }
@@ -0,0 +1,178 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], *extra: str) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(label for label in extra if label)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self, const: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key, const)} {value}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value, either set directly or read from a callback at scrape time"""
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Iterable[str] = (),
+            callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        self._values[key] = value
+
+    def collect(self, const: str = "") -> List[str]:
+        values = self.callback() if self.callback else self._values
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key, const)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket histogram with optional labels"""
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Iterable[str] = (),
+            buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket counts (last slot is +Inf), sum, count
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+        counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += value
+        series[2] += 1
+
+    def collect(self, const: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, const, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, const)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format.
+
+    Values live in this process only; with several workers each scrape hits
+    one of them, so every series carries a worker label to keep it monotonic.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self.const_labels = f'worker="{os.getpid()}"'
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect(self.const_labels))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route", "status"]
+)
+
+# Database
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Query latency by query name", ["query"]
+)
+db_query_rows = registry.counter(
+    "db_query_rows_total", "Rows returned by query name", ["query"]
+)
+db_query_errors = registry.counter(
+    "db_query_errors_total", "Failed queries by query name", ["query"]
+)
+db_slow_queries = registry.counter(
+    "db_slow_queries_total", "Queries slower than the slow-query threshold", ["query"]
+)
+db_pool_acquire_duration = registry.histogram(
+    "db_pool_acquire_seconds", "Time spent waiting for a pool connection", ["pool"]
+)
+db_pool_acquire_timeouts = registry.counter(
+    "db_pool_acquire_timeouts_total", "Requests rejected after waiting too long for a connection", ["pool"]
+)
+db_statement_timeouts = registry.counter(
+    "db_statement_timeouts_total", "Queries cancelled by their endpoint class timeout", ["query"]
+)
+
+
+def elapsed_since(started: float) -> float:
+    return time.perf_counter() - started
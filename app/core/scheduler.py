@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import asyncpg
+from typing import Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from app.config import settings
+from app.core.utils import archive_old_consignments
+from app.services.rollup_service import DashboardRollupService
+from app.db.partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Session-level advisory lock held by the worker that runs scheduled jobs
+SCHEDULER_LOCK_KEY = 7301001
+
+
+def build_scheduler() -> AsyncIOScheduler:
+    """Nightly maintenance jobs"""
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(
+        archive_old_consignments,
+        CronTrigger(hour=2, minute=0),
+        id='archive_consignments'
+    )
+    scheduler.add_job(
+        DashboardRollupService.reconcile,
+        CronTrigger(hour=2, minute=30),
+        args=[settings.rollup_reconcile_days],
+        id='reconcile_dashboard_rollup'
+    )
+    scheduler.add_job(
+        ensure_partitions,
+        CronTrigger(hour=1, minute=0),
+        id='ensure_partitions'
+    )
+    return scheduler
+
+
+class SchedulerLeader:
+    """Runs the scheduler in exactly one worker, elected through a Postgres advisory lock.
+
+    The lock lives on a dedicated connection outside the pool, so it is released
+    as soon as the leader's process or connection dies; followers keep retrying
+    and one of them takes over.
+    """
+
+    def __init__(self):
+        self.scheduler: Optional[AsyncIOScheduler] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.scheduler is not None
+
+    def start(self):
+        self._task = asyncio.create_task(self._campaign())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._step_down()
+
+    async def _campaign(self):
+        while True:
+            try:
+                if self._connection is None or self._connection.is_closed():
+                    await self._step_down()
+                    self._connection = await asyncpg.connect(settings.database_url)
+
+                if self.scheduler is None:
+                    acquired = await self._connection.fetchval(
+                        "SELECT pg_try_advisory_lock($1)", SCHEDULER_LOCK_KEY
+                    )
+                    if acquired:
+                        self.scheduler = build_scheduler()
+                        self.scheduler.start()
+                        logger.info("Elected scheduler leader")
+                else:
+                    # Holding the lock only means something while the session is alive
+                    await self._connection.fetchval("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as exc:
+                logger.warning("Scheduler leader election failed: %s", exc)
+                await self._step_down()
+
+            await asyncio.sleep(settings.scheduler_leader_retry_seconds)
+
+    async def _step_down(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            logger.info("Stepped down as scheduler leader")
+
+        if self._connection is not None:
+            # Closing the session releases the advisory lock
+            if not self._connection.is_closed():
+                await self._connection.close()
+            self._connection = None
+
+
+scheduler_leader = SchedulerLeader()
@@ -0,0 +1,48 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+from fastapi.responses import Response
+from app.core.timing import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def _default(value):
+    """Encode types neither serializer handles natively"""
+    if isinstance(value, Decimal):
+        # Same rule as FastAPI's decimal_encoder: SUM(bigint) counts stay ints
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serialize plain dicts/lists of DB values straight to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+def columns_for(model) -> str:
+    """SELECT list matching a response model, so raw rows have its exact shape"""
+    return ", ".join(model.model_fields)
+
+
+class RecordJSONResponse(Response):
+    """JSON response for rows we already trust; skips model validation and jsonable_encoder"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return dumps(content)
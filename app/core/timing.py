@@ -0,0 +1,24 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Per-request accumulated durations (seconds) by segment; None outside a request
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def record_timing(segment: str, duration: float):
+    """Add duration to a segment of the current request, if any"""
+    timings = request_timings.get()
+    if timings is not None:
+        timings[segment] = timings.get(segment, 0.0) + duration
+
+
+@contextmanager
+def timed(segment: str):
+    """Time a block into the current request's Server-Timing breakdown"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(segment, time.perf_counter() - started)
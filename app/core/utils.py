@@ -1,25 +1,248 @@
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import csv
+import io
+import json
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import HTTPException
+from app.config import settings
 from app.database import db
+from app.services.rollup_service import DashboardRollupService
+from app.db.partitions import (
+    TERMINAL_STATUSES as ARCHIVE_STATUSES, archive_expired_partitions, ensure_archive_months
+)
 
 
-async def archive_old_consignments():
-    """Archive consignments older than 6 months"""
-    cutoff_date = datetime.now() - timedelta(days=180)
+def encode_cursor(created_at: datetime, row_id) -> str:
+    """Build an opaque keyset cursor from (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    # Move old consignments to archive table
-    query = """
-    INSERT INTO consignments_archive 
-    SELECT * FROM consignments 
-    WHERE created_at < $1 AND status IN ('delivered', 'returned', 'lost')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Parse a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of etag against an If-None-Match list (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def _export_value(value):
+    """Plain representation of a DB value for export formats"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+async def start_stream(rows: AsyncIterator) -> AsyncIterator:
+    """Fetch the first row before a response is started.
+
+    Pool and statement timeouts opening the cursor then surface as a normal
+    503 instead of a 200 with an empty body. A failure after that propagates
+    out of the response body, so the server aborts the chunked transfer and
+    clients see an incomplete download rather than a short file that ended
+    cleanly.
+    """
+    iterator = rows.__aiter__()
+    try:
+        first = await iterator.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def resume():
+        if first is None:
+            return
+        yield first
+        async for row in iterator:
+            yield row
+
+    return resume()
+
+
+async def csv_stream(rows: AsyncIterator, columns: List[str], batch_size: int = 500) -> AsyncIterator[bytes]:
+    """Encode an async row iterator as CSV, flushing every batch_size rows.
+
+    The header comes from columns, not the first row, so an export that
+    matches nothing still carries its schema.
     """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+
+    async for row in rows:
+        writer.writerow([_export_value(row[column]) for column in columns])
+        pending += 1
+
+        if pending >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_stream(rows: AsyncIterator, batch_size: int = 500) -> AsyncIterator[bytes]:
+    """Encode an async row iterator as newline-delimited JSON"""
+    lines = []
+
+    async for row in rows:
+        lines.append(json.dumps({key: _export_value(value) for key, value in row.items()}, default=str))
 
-    await db.execute(query, cutoff_date)
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
 
-    # Delete from main table
-    delete_query = """
-    DELETE FROM consignments 
-    WHERE created_at < $1 AND status IN ('delivered', 'returned', 'lost')
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def archive_chunk(cutoff: datetime, batch_size: int, run_id: int) -> int:
+    """Move one bounded chunk of consignments and their status log to the archive"""
+    pick_query = """
+    SELECT id, created_at FROM consignments
+    WHERE created_at < $1 AND status = ANY($2::text[])
+    ORDER BY created_at
+    LIMIT $3
+    FOR UPDATE SKIP LOCKED
     """
 
-    await db.execute(delete_query, cutoff_date)
-    print(f"Archived consignments older than {cutoff_date}")
\ No newline at end of file
+    move_query = """
+    WITH moved_log AS (
+        DELETE FROM consignment_status_log
+        WHERE consignment_id = ANY($1::text[])
+        RETURNING *
+    ),
+    archived_log AS (
+        INSERT INTO consignment_status_log_archive SELECT * FROM moved_log
+    ),
+    moved AS (
+        DELETE FROM consignments
+        WHERE id = ANY($1::text[])
+        RETURNING *
+    ),
+    archived AS (
+        INSERT INTO consignments_archive SELECT * FROM moved
+    )
+    SELECT current_warehouse_id, created_at, status, delivered_at FROM moved
+    """
+
+    async with db.transaction() as connection:
+        picked = await connection.fetch(pick_query, cutoff, ARCHIVE_STATUSES, batch_size)
+        if not picked:
+            return 0
+
+        ids = [row['id'] for row in picked]
+        await ensure_archive_months(connection, ids)
+
+        moved = await connection.fetch(move_query, ids)
+
+        # Archived rows no longer count towards the dashboard
+        await DashboardRollupService.apply(
+            connection, [DashboardRollupService.removed_delta(row) for row in moved]
+        )
+
+        # Progress is committed with the chunk, so a crash never loses or repeats work
+        await connection.execute(
+            "UPDATE archive_runs SET rows_archived = rows_archived + $1, updated_at = NOW() WHERE id = $2",
+            len(moved),
+            run_id
+        )
+
+    return len(moved)
+
+
+async def archive_old_consignments() -> dict:
+    """Archive finished consignments older than the retention window in chunks"""
+    # Resume an interrupted run with its original cutoff, otherwise start a new one
+    run = await db.fetchrow(
+        "SELECT id, cutoff, rows_archived FROM archive_runs WHERE status = 'running' ORDER BY id LIMIT 1"
+    )
+    if not run:
+        cutoff_date = datetime.now() - timedelta(days=settings.archive_retention_days)
+        run = await db.fetchrow(
+            "INSERT INTO archive_runs (cutoff) VALUES ($1) RETURNING id, cutoff, rows_archived",
+            cutoff_date
+        )
+    run_id, cutoff_date = run['id'], run['cutoff']
+
+    # Whole expired months go first as a metadata-only partition move
+    partitions_moved = await archive_expired_partitions(cutoff_date)
+    if partitions_moved:
+        print(f"Archive run {run_id}: detached {partitions_moved} expired partitions")
+
+    backlog = await db.fetchrow(
+        "SELECT COUNT(*) FROM consignments WHERE created_at < $1 AND status = ANY($2::text[])",
+        cutoff_date,
+        ARCHIVE_STATUSES
+    )
+    remaining = backlog['count']
+    print(f"Archive run {run_id}: {remaining} consignments older than {cutoff_date} to archive")
+
+    started = time.monotonic()
+    archived = 0
+
+    while True:
+        moved = await archive_chunk(cutoff_date, settings.archive_batch_size, run_id)
+        archived += moved
+        remaining = max(remaining - moved, 0)
+
+        if moved < settings.archive_batch_size:
+            # A short chunk may only mean the rest was locked (SKIP LOCKED), so
+            # close the run only once nothing eligible is left
+            pending = await db.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM consignments WHERE created_at < $1 AND status = ANY($2::text[]))",
+                cutoff_date,
+                ARCHIVE_STATUSES
+            )
+            if not pending:
+                await db.execute(
+                    "UPDATE archive_runs SET status = 'completed', finished_at = NOW(), updated_at = NOW() WHERE id = $1",
+                    run_id
+                )
+                remaining = 0
+                break
+
+        elapsed = time.monotonic() - started
+        if elapsed >= settings.archive_max_runtime_seconds:
+            # Leave the run open; the next invocation picks it up
+            print(f"Archive run {run_id}: pausing after {elapsed:.0f}s, {remaining} left")
+            break
+
+        await asyncio.sleep(settings.archive_batch_pause_seconds)
+
+    elapsed = time.monotonic() - started
+    rate = archived / elapsed if elapsed > 0 else 0
+    print(
+        f"Archive run {run_id}: archived {archived} consignments in {elapsed:.1f}s "
+        f"({rate:.0f} rows/sec), {remaining} remaining"
+    )
+
+    return {
+        "run_id": run_id,
+        "partitions_moved": partitions_moved,
+        "archived": archived,
+        "remaining": remaining,
+        "rows_per_second": round(rate, 2)
+    }
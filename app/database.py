@@ -1,45 +1,248 @@
+import asyncio
+import functools
+import logging
+import re
+import time
 import asyncpg
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
 from app.config import settings
+from app.core.metrics import (
+    registry, elapsed_since, db_query_duration, db_query_rows, db_query_errors,
+    db_slow_queries, db_pool_acquire_duration, db_pool_acquire_timeouts, db_statement_timeouts
+)
+from app.core.timing import record_timing, timed
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
+# Endpoint class of the current request; selects its statement timeout
+statement_class: ContextVar[Optional[str]] = ContextVar("statement_class", default=None)
+
+
+class DatabaseOverloadedError(Exception):
+    """Base for errors the API turns into a retryable 503"""
+
+
+class PoolTimeoutError(DatabaseOverloadedError):
+    """No pool connection became free within the acquire timeout"""
+
+
+class StatementTimeoutError(DatabaseOverloadedError):
+    """A query ran past its endpoint class statement timeout"""
+
+
+def statement_timeout() -> Optional[float]:
+    """Statement timeout in seconds for the current endpoint class, if any"""
+    endpoint_class = statement_class.get()
+    if endpoint_class is None:
+        return None
+    timeout_ms = getattr(settings, f"statement_timeout_{endpoint_class}_ms")
+    return timeout_ms / 1000 if timeout_ms else None
+
+
+def use_statement_class(endpoint_class: str):
+    """Router/route dependency tagging requests with an endpoint class"""
+    # Validate eagerly so a typo fails at import time
+    getattr(settings, f"statement_timeout_{endpoint_class}_ms")
+
+    async def dependency():
+        statement_class.set(endpoint_class)
+
+    return dependency
+
+
+async def _create_pool(dsn: str) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        dsn,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        command_timeout=settings.db_command_timeout_seconds,
+        statement_cache_size=settings.db_statement_cache_size
+    )
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([a-zA-Z_][a-zA-Z0-9_]*)", re.IGNORECASE)
+
+
+def query_name(query: str) -> str:
+    """Short label for an unnamed query: statement verb plus first table"""
+    verb = query.split(None, 1)[0].upper() if query.strip() else "QUERY"
+    match = _TABLE_PATTERN.search(query)
+    return f"{verb.lower()}_{match.group(1).lower()}" if match else verb.lower()
+
+
+def _row_count(method: str, result) -> int:
+    if method == "fetch":
+        return len(result)
+    if method == "fetchrow":
+        return 1 if result else 0
+    if method == "fetchval":
+        return 0 if result is None else 1
+    # Command tag such as "UPDATE 3"
+    last = str(result).rsplit(" ", 1)[-1]
+    return int(last) if last.isdigit() else 0
+
 
 class Database:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self.replica_pool: Optional[asyncpg.Pool] = None
 
     async def connect(self):
-        """Create database connection pool"""
-        self.pool = await asyncpg.create_pool(
-            settings.database_url,
-            min_size=5,
-            max_size=20,
-            command_timeout=60
-        )
+        """Create database connection pools"""
+        self.pool = await _create_pool(settings.database_url)
+
+        if settings.database_replica_url:
+            self.replica_pool = await _create_pool(settings.database_replica_url)
 
     async def disconnect(self):
-        """Close database connection pool"""
+        """Close database connection pools"""
+        if self.replica_pool:
+            await self.replica_pool.close()
         if self.pool:
             await self.pool.close()
 
-    async def execute(self, query: str, *args):
+    def _select_pool(self, replica: bool):
+        """Replica pool when asked for and configured, otherwise the primary.
+
+        Only reads that tolerate replication lag (dashboard, listings, export)
+        pass replica=True; anything that feeds a cache or must see a just
+        committed write stays on the primary.
+        """
+        if replica and self.replica_pool:
+            return self.replica_pool, "replica"
+        return self.pool, "primary"
+
+    @asynccontextmanager
+    async def acquire(self, replica: bool = False):
+        """Acquire a pool connection, failing fast instead of queuing indefinitely"""
+        pool, label = self._select_pool(replica)
+        started = time.perf_counter()
+        try:
+            connection = await pool.acquire(timeout=settings.db_pool_acquire_timeout_seconds)
+        except asyncio.TimeoutError:
+            db_pool_acquire_timeouts.inc(pool=label)
+            record_timing("db_wait", elapsed_since(started))
+            raise PoolTimeoutError(f"No {label} database connection available")
+
+        try:
+            wait = elapsed_since(started)
+            db_pool_acquire_duration.observe(wait, pool=label)
+            record_timing("db_wait", wait)
+            yield connection
+        finally:
+            await pool.release(connection)
+
+    async def _run(self, method: str, query: str, args: tuple, name: Optional[str], replica: bool = False):
+        """Run one query on a pooled connection and record its metrics"""
+        name = name or query_name(query)
+
+        async with self.acquire(replica) as connection:
+            started = time.perf_counter()
+            try:
+                result = await getattr(connection, method)(query, *args, timeout=statement_timeout())
+            except (asyncio.TimeoutError, asyncpg.QueryCanceledError):
+                db_query_errors.inc(query=name)
+                db_statement_timeouts.inc(query=name)
+                raise StatementTimeoutError(f"Query {name} exceeded its statement timeout")
+            except Exception:
+                db_query_errors.inc(query=name)
+                raise
+            duration = elapsed_since(started)
+
+        db_query_duration.observe(duration, query=name)
+        record_timing("db", duration)
+        db_query_rows.inc(_row_count(method, result), query=name)
+
+        if duration * 1000 >= settings.slow_query_ms:
+            db_slow_queries.inc(query=name)
+            logger.warning(
+                "Slow query %s took %.1fms: %s", name, duration * 1000, " ".join(query.split())[:500]
+            )
+
+        return result
+
+    async def execute(self, query: str, *args, name: Optional[str] = None):
         """Execute a query"""
-        async with self.pool.acquire() as connection:
-            return await connection.execute(query, *args)
+        return await self._run("execute", query, args, name)
 
-    async def fetch(self, query: str, *args):
+    async def fetch(self, query: str, *args, name: Optional[str] = None, replica: bool = False):
         """Fetch multiple rows"""
-        async with self.pool.acquire() as connection:
-            return await connection.fetch(query, *args)
+        return await self._run("fetch", query, args, name, replica)
 
-    async def fetchrow(self, query: str, *args):
+    async def fetchrow(self, query: str, *args, name: Optional[str] = None, replica: bool = False):
         """Fetch single row"""
-        async with self.pool.acquire() as connection:
-            return await connection.fetchrow(query, *args)
+        return await self._run("fetchrow", query, args, name, replica)
+
+    async def fetchval(self, query: str, *args, name: Optional[str] = None, replica: bool = False):
+        """Fetch a single value"""
+        return await self._run("fetchval", query, args, name, replica)
+
+    async def iterate(self, query: str, *args, prefetch: int = 500, replica: bool = False):
+        """Stream rows through a server-side cursor"""
+        async with self.acquire(replica) as connection:
+            try:
+                async with connection.transaction():
+                    timeout = statement_timeout()
+                    if timeout:
+                        await connection.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+                    async for record in connection.cursor(query, *args, prefetch=prefetch):
+                        yield record
+            except asyncpg.QueryCanceledError:
+                db_statement_timeouts.inc(query=query_name(query))
+                raise StatementTimeoutError("Cursor exceeded its statement timeout")
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Acquire a connection with an open transaction"""
+        async with self.acquire() as connection:
+            with timed("db"):
+                try:
+                    async with connection.transaction():
+                        timeout = statement_timeout()
+                        if timeout:
+                            await connection.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+                        yield connection
+                except asyncpg.QueryCanceledError:
+                    # Raised server-side by SET LOCAL statement_timeout
+                    db_statement_timeouts.inc(query="transaction")
+                    raise StatementTimeoutError("Transaction exceeded its statement timeout")
+
+    def pool_stats(self) -> dict:
+        """Connection counts by state for the metrics endpoint"""
+        stats = {}
+        for label, pool in (("primary", self.pool), ("replica", self.replica_pool)):
+            if not pool:
+                continue
+            size = pool.get_size()
+            idle = pool.get_idle_size()
+            stats[(label, "in_use")] = size - idle
+            stats[(label, "idle")] = idle
+            stats[(label, "max")] = pool.get_max_size()
+        return stats
 
 
 # Database instance
 db = Database()
 
+registry.gauge(
+    "db_pool_connections", "Pool connections by state", ["pool", "state"], callback=db.pool_stats
+)
+
 # Supabase client
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
\ No newline at end of file
+supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
+
+# Bounded worker pool for the synchronous Supabase client
+supabase_executor = ThreadPoolExecutor(
+    max_workers=settings.supabase_max_workers,
+    thread_name_prefix="supabase"
+)
+
+
+async def run_supabase(func, *args, **kwargs):
+    """Run a blocking Supabase call without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    with timed("supabase"):
+        return await loop.run_in_executor(supabase_executor, functools.partial(func, *args, **kwargs))
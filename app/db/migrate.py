@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import List
+from app.db.partitions import build_partitioned_indexes
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# First line of a migration that must run outside a transaction block
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+
+def _statements(sql: str) -> List[str]:
+    """Split a plain (no dollar-quoted bodies) script into single statements"""
+    statements = []
+    for chunk in sql.split(";"):
+        code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--"))
+        if code.strip():
+            statements.append(chunk.strip())
+    return statements
+
+
+async def run_migrations(connection) -> List[str]:
+    """Apply pending migrations in version order, recording each in schema_migrations"""
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    applied = {row['version'] for row in await connection.fetch("SELECT version FROM schema_migrations")}
+
+    ran = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        version = path.stem
+        if version in applied:
+            continue
+
+        print(f"Executing migration: {path.name}")
+        sql = path.read_text()
+
+        if sql.startswith(NO_TRANSACTION):
+            # CREATE INDEX CONCURRENTLY refuses to run inside a (multi-statement) transaction
+            for statement in _statements(sql):
+                await connection.execute(statement)
+            await build_partitioned_indexes(connection)
+        else:
+            await connection.execute(sql)
+
+        await connection.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+        ran.append(version)
+
+    return ran
@@ -0,0 +1,16 @@
+-- Per warehouse / creation day / status counters backing the dashboard.
+-- Maintained incrementally by ConsignmentService; rebuilt with
+-- scripts/rebuild_dashboard_rollup.py.
+CREATE TABLE IF NOT EXISTS consignment_daily_rollup (
+    warehouse_id TEXT NOT NULL,
+    day DATE NOT NULL,
+    status TEXT NOT NULL,
+    consignment_count BIGINT NOT NULL DEFAULT 0,
+    delivered_count BIGINT NOT NULL DEFAULT 0,
+    delivery_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (warehouse_id, day, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_consignment_daily_rollup_day
+    ON consignment_daily_rollup (day, status);
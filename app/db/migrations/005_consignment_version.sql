@@ -0,0 +1,7 @@
+-- Row version for optimistic concurrency on status transitions
+ALTER TABLE consignments
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+-- Archiving copies rows with SELECT *, so the archive needs the same column
+ALTER TABLE consignments_archive
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,14 @@
+-- Status history moves to the archive together with its consignment
+CREATE TABLE IF NOT EXISTS consignment_status_log_archive
+    (LIKE consignment_status_log INCLUDING DEFAULTS);
+
+-- One row per archiver run; an unfinished run is resumed with its cutoff
+CREATE TABLE IF NOT EXISTS archive_runs (
+    id BIGSERIAL PRIMARY KEY,
+    cutoff TIMESTAMPTZ NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    rows_archived BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
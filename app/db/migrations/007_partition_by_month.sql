@@ -0,0 +1,196 @@
+-- Monthly range partitioning on created_at for consignments, the status log
+-- and both archive tables. Partitions are named <table>_pYYYYMM; future ones
+-- are created by app/db/partitions.py (startup, daily job and setup_db.py).
+
+CREATE OR REPLACE FUNCTION ensure_monthly_partition(parent TEXT, month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_month DATE := date_trunc('month', month)::date;
+    partition_name TEXT := parent || '_p' || to_char(start_month, 'YYYYMM');
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_month, (start_month + INTERVAL '1 month')::date
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, from_month DATE, to_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    month DATE := date_trunc('month', from_month)::date;
+    created INTEGER := 0;
+BEGIN
+    WHILE month <= date_trunc('month', to_month)::date LOOP
+        IF to_regclass(parent || '_p' || to_char(month, 'YYYYMM')) IS NULL THEN
+            PERFORM ensure_monthly_partition(parent, month);
+            created := created + 1;
+        END IF;
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Rebuild a plain table as a partitioned one, keeping rows, defaults,
+-- sequences, outgoing foreign keys, row triggers and secondary indexes.
+-- Unique indexes must include created_at on a partitioned table, so the
+-- primary key becomes (id, created_at) and other unique indexes without
+-- created_at are kept as plain indexes (tracking numbers: see 008).
+CREATE OR REPLACE FUNCTION partition_table_by_month(table_name TEXT, months_ahead INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    legacy TEXT := table_name || '_legacy';
+    first_month DATE;
+    rec RECORD;
+    seq TEXT;
+    definition TEXT;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(table_name)
+    ) THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', table_name, legacy);
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY) '
+        'PARTITION BY RANGE (created_at)',
+        table_name, legacy
+    );
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET NOT NULL', table_name);
+
+    -- Free the <table>_pkey name for the new primary key
+    FOR rec IN
+        SELECT c.relname AS index_name
+        FROM pg_index x
+        JOIN pg_class c ON c.oid = x.indexrelid
+        WHERE x.indrelid = legacy::regclass AND x.indisprimary
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', rec.index_name, left(rec.index_name, 56) || '_legacy');
+    END LOOP;
+
+    IF EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = legacy::regclass AND attname = 'id' AND NOT attisdropped
+    ) THEN
+        EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, created_at)', table_name);
+    END IF;
+
+    -- Serial sequences must outlive the legacy table
+    FOR rec IN
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = legacy::regclass AND attnum > 0 AND NOT attisdropped
+    LOOP
+        seq := pg_get_serial_sequence(legacy, rec.attname);
+        IF seq IS NOT NULL AND pg_get_serial_sequence(table_name, rec.attname) IS NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.%I', seq, table_name, rec.attname);
+        END IF;
+    END LOOP;
+
+    -- Outgoing foreign keys, except those into tables being partitioned here
+    FOR rec IN
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = legacy::regclass AND contype = 'f'
+        AND confrelid::regclass::text NOT IN (
+            'consignments', 'consignments_legacy',
+            'consignments_archive', 'consignments_archive_legacy'
+        )
+    LOOP
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I %s', table_name, rec.conname, rec.definition);
+    END LOOP;
+
+    -- Row triggers (updated_at maintenance etc.)
+    FOR rec IN
+        SELECT pg_get_triggerdef(oid) AS definition
+        FROM pg_trigger
+        WHERE tgrelid = legacy::regclass AND NOT tgisinternal
+    LOOP
+        EXECUTE regexp_replace(rec.definition, ' ON \S+ ', ' ON ' || quote_ident(table_name) || ' ');
+    END LOOP;
+
+    EXECUTE format('SELECT date_trunc(''month'', MIN(created_at))::date FROM %I', legacy) INTO first_month;
+    PERFORM ensure_monthly_partitions(
+        table_name,
+        COALESCE(first_month, CURRENT_DATE),
+        (CURRENT_DATE + make_interval(months => months_ahead))::date
+    );
+
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', table_name, legacy);
+
+    -- Secondary indexes, rebuilt as partitioned indexes under their original names
+    FOR rec IN
+        SELECT
+            c.relname AS index_name,
+            pg_get_indexdef(x.indexrelid) AS definition,
+            x.indisunique AND NOT EXISTS (
+                SELECT 1 FROM pg_attribute a
+                WHERE a.attrelid = x.indrelid AND a.attname = 'created_at'
+                AND a.attnum = ANY(x.indkey)
+            ) AS drop_unique
+        FROM pg_index x
+        JOIN pg_class c ON c.oid = x.indexrelid
+        WHERE x.indrelid = legacy::regclass AND NOT x.indisprimary
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', rec.index_name, left(rec.index_name, 56) || '_legacy');
+        definition := regexp_replace(rec.definition, ' ON \S+ USING ', ' ON ' || quote_ident(table_name) || ' USING ');
+        IF rec.drop_unique THEN
+            definition := regexp_replace(definition, '^CREATE UNIQUE INDEX', 'CREATE INDEX');
+            RAISE NOTICE 'Index % on % is no longer unique after partitioning', rec.index_name, table_name;
+        END IF;
+        EXECUTE definition;
+    END LOOP;
+
+    FOR rec IN
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = table_name::regclass AND attnum > 0 AND NOT attisdropped
+    LOOP
+        seq := pg_get_serial_sequence(table_name, rec.attname);
+        IF seq IS NOT NULL THEN
+            EXECUTE format(
+                'SELECT setval(%L, COALESCE((SELECT MAX(%I) FROM %I), 0) + 1, false)',
+                seq, rec.attname, table_name
+            );
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+BEGIN;
+
+SELECT partition_table_by_month('consignments', 3);
+SELECT partition_table_by_month('consignment_status_log', 3);
+SELECT partition_table_by_month('consignments_archive', 0);
+SELECT partition_table_by_month('consignment_status_log_archive', 0);
+
+-- Foreign keys into consignments cannot survive partitioning on created_at
+DO $$
+DECLARE
+    rec RECORD;
+BEGIN
+    FOR rec IN
+        SELECT conrelid::regclass AS table_name, conname
+        FROM pg_constraint
+        WHERE contype = 'f'
+        AND confrelid IN (
+            to_regclass('consignments_legacy'), to_regclass('consignments_archive_legacy')
+        )
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', rec.table_name, rec.conname);
+    END LOOP;
+END;
+$$;
+
+DROP TABLE IF EXISTS consignment_status_log_legacy;
+DROP TABLE IF EXISTS consignment_status_log_archive_legacy;
+DROP TABLE IF EXISTS consignments_legacy;
+DROP TABLE IF EXISTS consignments_archive_legacy;
+
+COMMIT;
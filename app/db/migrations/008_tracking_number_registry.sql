@@ -0,0 +1,35 @@
+-- Unique indexes on a partitioned table must include created_at, so global
+-- tracking number uniqueness (live and archived) is enforced by a registry
+-- that every consignment insert goes through. Entries are kept when a
+-- consignment is archived, so numbers are never reused.
+CREATE TABLE IF NOT EXISTS consignment_tracking_numbers (
+    tracking_number TEXT PRIMARY KEY,
+    consignment_id TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION register_tracking_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO consignment_tracking_numbers (tracking_number, consignment_id, created_at)
+    VALUES (NEW.tracking_number, NEW.id, NEW.created_at);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS consignments_register_tracking_number ON consignments;
+CREATE TRIGGER consignments_register_tracking_number
+    AFTER INSERT ON consignments
+    FOR EACH ROW EXECUTE FUNCTION register_tracking_number();
+
+INSERT INTO consignment_tracking_numbers (tracking_number, consignment_id, created_at)
+SELECT tracking_number, id, created_at FROM consignments_archive
+ON CONFLICT (tracking_number) DO NOTHING;
+
+INSERT INTO consignment_tracking_numbers (tracking_number, consignment_id, created_at)
+SELECT tracking_number, id, created_at FROM consignments
+ON CONFLICT (tracking_number) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,21 @@
+-- migrate: no-transaction
+-- Indexes matched to the service access paths, built without blocking writes.
+-- Partitioned tables take an ON ONLY parent index; the migration runner then
+-- builds each partition's index CONCURRENTLY and attaches it, after which the
+-- parent becomes valid and new partitions inherit it automatically.
+
+-- Active warehouse listing: WHERE is_active ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_warehouses_active_created
+    ON warehouses (created_at DESC) WHERE is_active;
+
+-- Warehouse/status filtered listings and counts with created_at ranges
+CREATE INDEX IF NOT EXISTS idx_consignments_warehouse_status_created
+    ON ONLY consignments (current_warehouse_id, status, created_at);
+
+-- Tracking lookups (uniqueness lives in consignment_tracking_numbers, see 008)
+CREATE INDEX IF NOT EXISTS idx_consignments_tracking_number
+    ON ONLY consignments (tracking_number);
+
+-- Status history per consignment, newest last
+CREATE INDEX IF NOT EXISTS idx_consignment_status_log_consignment_created
+    ON ONLY consignment_status_log (consignment_id, created_at);
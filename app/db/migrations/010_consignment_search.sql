@@ -0,0 +1,25 @@
+-- migrate: no-transaction
+-- Fuzzy search over sender/receiver fields for GET /consignments/search.
+-- The indexed expressions must match SEARCH_TEXT / SEARCH_DOCUMENT in
+-- app/services/consignment_service.py exactly for the planner to use them.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Partial names, phone fragments and misspellings (word_similarity / <%)
+CREATE INDEX IF NOT EXISTS idx_consignments_search_trgm
+    ON ONLY consignments USING gin ((
+        lower(
+            coalesce(sender_name, '') || ' ' || coalesce(sender_phone, '') || ' ' ||
+            coalesce(sender_address, '') || ' ' || coalesce(receiver_name, '') || ' ' ||
+            coalesce(receiver_phone, '') || ' ' || coalesce(receiver_address, '')
+        )
+    ) gin_trgm_ops);
+
+-- Whole-word matches across names and addresses, ranked with ts_rank
+CREATE INDEX IF NOT EXISTS idx_consignments_search_fts
+    ON ONLY consignments USING gin ((
+        to_tsvector('simple',
+            coalesce(sender_name, '') || ' ' || coalesce(sender_address, '') || ' ' ||
+            coalesce(receiver_name, '') || ' ' || coalesce(receiver_address, '')
+        )
+    ));
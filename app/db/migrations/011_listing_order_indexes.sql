@@ -0,0 +1,15 @@
+-- migrate: no-transaction
+-- Indexes for the ORDER BY paths 009 missed; btree scans serve the DESC
+-- orderings backwards. Built per partition by the migration runner.
+
+-- Warehouse-scoped offset/keyset listing: ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_consignments_warehouse_created_id
+    ON ONLY consignments (current_warehouse_id, created_at, id);
+
+-- Unscoped (admin) listing and export with the same ordering
+CREATE INDEX IF NOT EXISTS idx_consignments_created_id
+    ON ONLY consignments (created_at, id);
+
+-- Recent activities: newest status log entries first
+CREATE INDEX IF NOT EXISTS idx_consignment_status_log_created
+    ON ONLY consignment_status_log (created_at);
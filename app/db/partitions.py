@@ -0,0 +1,240 @@
+import logging
+import re
+import asyncpg
+from datetime import date, datetime
+from typing import List
+from app.config import settings
+from app.database import db
+from app.services.rollup_service import DashboardRollupService
+
+logger = logging.getLogger(__name__)
+
+# Live tables and the archive tables their expired partitions move to
+PARTITIONED_TABLES = {
+    "consignments": "consignments_archive",
+    "consignment_status_log": "consignment_status_log_archive",
+}
+
+TERMINAL_STATUSES = ['delivered', 'returned', 'lost']
+
+
+def month_of(partition_name: str) -> date:
+    """Month a <table>_pYYYYMM partition covers"""
+    suffix = partition_name.rsplit("_p", 1)[1]
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+async def ensure_partitions(months_ahead: int = None) -> int:
+    """Create partitions from the current month up to months_ahead"""
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    created = 0
+
+    async with db.transaction() as connection:
+        # Every worker runs this at startup; serialize so they don't race on CREATE TABLE
+        await connection.execute("SELECT pg_advisory_xact_lock(hashtext('ensure_partitions'))")
+
+        for table in PARTITIONED_TABLES:
+            result = await connection.fetchrow(
+                """
+                SELECT ensure_monthly_partitions(
+                    $1, CURRENT_DATE, (CURRENT_DATE + make_interval(months => $2::int))::date
+                ) as created
+                """,
+                table,
+                months_ahead
+            )
+            created += result['created']
+
+    return created
+
+
+async def ensure_archive_months(connection, consignment_ids: List[str]):
+    """Open the archive partitions a row-level archive chunk is about to write to"""
+    for table, archive_table in PARTITIONED_TABLES.items():
+        id_column = "id" if table == "consignments" else "consignment_id"
+        months = await connection.fetch(
+            f"""
+            SELECT DISTINCT date_trunc('month', created_at)::date as month
+            FROM {table}
+            WHERE {id_column} = ANY($1::text[])
+            """,
+            consignment_ids
+        )
+        for row in months:
+            await connection.execute(
+                "SELECT ensure_monthly_partition($1, $2)", archive_table, row['month']
+            )
+
+
+async def list_partitions(table: str) -> List[str]:
+    """Names of the monthly partitions attached to table, oldest first"""
+    rows = await db.fetch(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = $1::regclass
+        AND c.relname ~ '_p[0-9]{6}$'
+        ORDER BY c.relname
+        """,
+        table
+    )
+    return [row['relname'] for row in rows]
+
+
+async def _move_partition(connection, table: str, partition: str):
+    """Detach a partition and hang it under the matching archive table"""
+    archive_table = PARTITIONED_TABLES[table]
+    archive_partition = archive_table + partition[len(table):]
+
+    await connection.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{partition}"')
+
+    exists = await connection.fetchval("SELECT to_regclass($1) IS NOT NULL", archive_partition)
+    if exists:
+        # Earlier row-level archiving already opened this archive month
+        await connection.execute(f'INSERT INTO "{archive_partition}" SELECT * FROM "{partition}"')
+        await connection.execute(f'DROP TABLE "{partition}"')
+        return
+
+    month = month_of(partition)
+    await connection.execute(f'ALTER TABLE "{partition}" RENAME TO "{archive_partition}"')
+    await connection.execute(
+        f"""
+        ALTER TABLE "{archive_table}" ATTACH PARTITION "{archive_partition}"
+        FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')
+        """
+    )
+
+
+async def _archive_consignment_partition(partition: str) -> bool:
+    """Detach one consignments month, unless a row in it became live again"""
+    async with db.transaction() as connection:
+        await connection.execute(f"SET LOCAL lock_timeout = '{settings.partition_lock_timeout_ms}ms'")
+        # Freeze the month's rows (reads still allowed) so the re-check stays true until DETACH
+        await connection.execute(f'LOCK TABLE "{partition}" IN SHARE MODE')
+
+        # lost -> in_transit and delivered -> returned can revive a row after the first check
+        unfinished = await connection.fetchval(
+            f'SELECT EXISTS (SELECT 1 FROM "{partition}" WHERE status <> ALL($1::text[]))',
+            TERMINAL_STATUSES
+        )
+        if unfinished:
+            return False
+
+        await DashboardRollupService.subtract_table(connection, partition)
+        await _move_partition(connection, "consignments", partition)
+    return True
+
+
+async def _archive_log_partition(partition: str):
+    async with db.transaction() as connection:
+        await connection.execute(f"SET LOCAL lock_timeout = '{settings.partition_lock_timeout_ms}ms'")
+        await _move_partition(connection, "consignment_status_log", partition)
+
+
+async def archive_expired_partitions(cutoff: datetime) -> int:
+    """Archive whole months older than cutoff by detaching their partitions"""
+    moved = 0
+
+    for partition in await list_partitions("consignments"):
+        if next_month(month_of(partition)) > cutoff.date():
+            break
+
+        # Cheap unlocked pre-check; repeated under the lock before detaching
+        unfinished = await db.fetchval(
+            f'SELECT EXISTS (SELECT 1 FROM "{partition}" WHERE status <> ALL($1::text[]))',
+            TERMINAL_STATUSES
+        )
+        if unfinished:
+            continue
+
+        try:
+            moved += await _archive_consignment_partition(partition)
+        except (asyncpg.LockNotAvailableError, asyncpg.DeadlockDetectedError):
+            # Busy month: leave it for the next run rather than failing the whole archive
+            logger.warning("Skipped archiving %s: could not lock it", partition)
+
+    for partition in await list_partitions("consignment_status_log"):
+        if next_month(month_of(partition)) > cutoff.date():
+            break
+
+        # Only move history once none of it belongs to a live consignment
+        referenced = await db.fetchval(
+            f"""
+            SELECT EXISTS (
+                SELECT 1 FROM "{partition}" l
+                WHERE EXISTS (SELECT 1 FROM consignments c WHERE c.id = l.consignment_id)
+            )
+            """
+        )
+        if referenced:
+            continue
+
+        try:
+            await _archive_log_partition(partition)
+            moved += 1
+        except (asyncpg.LockNotAvailableError, asyncpg.DeadlockDetectedError):
+            logger.warning("Skipped archiving %s: could not lock it", partition)
+
+    return moved
+
+
+async def build_partitioned_indexes(connection) -> int:
+    """Finish ON ONLY parent indexes: build each partition's index concurrently, then attach it"""
+    parents = await connection.fetch(
+        """
+        SELECT
+            i.indexrelid::regclass::text as index_name,
+            i.indrelid::regclass::text as table_name,
+            pg_get_indexdef(i.indexrelid) as definition
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relkind = 'I' AND NOT i.indisvalid
+        """
+    )
+    built = 0
+
+    for parent in parents:
+        # e.g. idx_consignments_tracking_number -> consignments_p202401_tracking_number_idx
+        suffix = re.sub(rf"^idx_{re.escape(parent['table_name'])}_", "", parent['index_name'])
+        method_and_columns = parent['definition'].split(" USING ", 1)[1]
+
+        partitions = await connection.fetch(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = $1::regclass
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_inherits ii
+                JOIN pg_index x ON x.indexrelid = ii.inhrelid
+                WHERE ii.inhparent = $2::regclass AND x.indrelid = c.oid
+            )
+            ORDER BY c.relname
+            """,
+            parent['table_name'],
+            parent['index_name']
+        )
+
+        for row in partitions:
+            partition = row['relname']
+            child = f"{partition}_{suffix}"[:59] + "_idx"
+
+            # Left behind invalid by an interrupted earlier build
+            invalid = await connection.fetchval(
+                "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", child
+            )
+            if invalid:
+                await connection.execute(f'DROP INDEX CONCURRENTLY "{child}"')
+
+            await connection.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{child}" ON "{partition}" USING {method_and_columns}'
+            )
+            await connection.execute(f'ALTER INDEX {parent["index_name"]} ATTACH PARTITION "{child}"')
+            built += 1
+
+    return built
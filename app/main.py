@@ -1,13 +1,19 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 import time
 
-from app.database import db
+from app.database import db, supabase_executor, DatabaseOverloadedError
 from app.config import settings
-from app.core.utils import archive_old_consignments
+from app.core.auth import principal_cache, invalidate_principal
+from app.db.partitions import ensure_partitions
+from app.core.metrics import registry
+from app.core.scheduler import scheduler_leader
+from app.middleware.timing_middleware import ServerTimingMiddleware, TimedJSONResponse
+from app.services.consignment_service import tracking_cache, count_cache
+from app.services.dashboard_service import dashboard_cache
+from app.services.notification_service import status_feed
 
 # Import routers
 from app.api import auth, users, warehouses, consignments, dashboard
@@ -17,28 +23,32 @@ from app.api import auth, users, warehouses, consignments, dashboard
 async def lifespan(app: FastAPI):
     # Startup
     await db.connect()
+    await ensure_partitions()
 
-    # Setup scheduler
-    scheduler = AsyncIOScheduler()
-    scheduler.add_job(
-        archive_old_consignments,
-        CronTrigger(hour=2, minute=0),
-        id='archive_consignments'
-    )
-    scheduler.start()
+    # Only one worker runs the scheduled jobs
+    scheduler_leader.start()
+
+    # Shared LISTEN connection feeding this worker's live subscribers and
+    # carrying cache invalidations from the other workers
+    status_feed.on_status_event(lambda event: tracking_cache.invalidate(event["tracking_number"]))
+    status_feed.on_invalidation("principal", invalidate_principal)
+    status_feed.start()
 
     yield
 
     # Shutdown
+    await status_feed.stop()
+    await scheduler_leader.stop()
     await db.disconnect()
-    scheduler.shutdown()
+    supabase_executor.shutdown(wait=False)
 
 
 app = FastAPI(
     title=settings.app_name,
     description="Backend API for logistics company management",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
 # CORS middleware
@@ -51,14 +61,36 @@ app.add_middleware(
 )
 
 
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# Request timing middleware (outermost, so it sees the whole request)
+app.add_middleware(ServerTimingMiddleware)
+
+
+@app.exception_handler(DatabaseOverloadedError)
+async def database_overloaded(request: Request, exc: Exception):
+    """Shed load with a retryable 503 instead of queuing behind a saturated pool"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily overloaded, please retry"},
+        headers={"Retry-After": str(settings.db_retry_after_seconds)}
+    )
+
+
+def _cache_stats():
+    stats = {}
+    for cache_name, cache in (
+            ("principal", principal_cache), ("tracking", tracking_cache), ("count", count_cache),
+            ("dashboard", dashboard_cache)
+    ):
+        for stat, value in cache.stats().items():
+            stats[(cache_name, stat)] = value
+    return stats
+
+
+registry.gauge("cache_stats", "In-process cache counters", ["cache", "stat"], callback=_cache_stats)
+registry.gauge(
+    "live_feed_stats", "Live status feed counters", ["stat"],
+    callback=lambda: {(stat,): value for stat, value in status_feed.stats().items()}
+)
 
 
 # Include routers
@@ -76,4 +108,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": time.time()}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "timestamp": time.time(),
+        "scheduler_leader": scheduler_leader.is_leader,
+        "principal_cache": principal_cache.stats()
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,14 +1,21 @@
+import time
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.auth import decode_token
-from app.database import supabase
+from app.core.auth import decode_token, principal_cache
+from app.database import supabase, run_supabase
+from app.core.timing import timed
 
 security = HTTPBearer()
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current authenticated user"""
-    token = credentials.credentials
+    with timed("auth"):
+        return await _resolve_user(credentials.credentials)
+
+
+async def _resolve_user(token: str):
+    """Decode the token and load the active user it belongs to"""
 
     # Decode token
     payload = decode_token(token)
@@ -28,21 +35,27 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
 
     try:
-        user_data = supabase.table("user_management").select("*").eq("email", email).execute()
-        if not user_data.data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
+        user = principal_cache.get(email)
+        if user is None:
+            loaded_since = time.monotonic()
+            user_data = await run_supabase(supabase.table("user_management").select("*").eq("email", email).execute)
+            if not user_data.data:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found"
+                )
+
+            user = user_data.data[0]
+            # Skipped if update_user/delete_user invalidated while we were fetching
+            principal_cache.set(email, user, loaded_since=loaded_since)
 
-        user = user_data.data[0]
         if not user.get("is_active"):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User account is disabled"
             )
 
-        return user
+        return dict(user)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
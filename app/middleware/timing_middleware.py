@@ -0,0 +1,72 @@
+import json
+import logging
+import random
+import time
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.core.metrics import http_request_duration
+from app.core.timing import request_timings, timed
+
+logger = logging.getLogger(__name__)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that books its rendering time under 'serialize'"""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware emitting a Server-Timing breakdown per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = request_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total = time.perf_counter() - started
+                segments = [f"{name};dur={duration * 1000:.1f}" for name, duration in timings.items()]
+                segments.append(f"total;dur={total * 1000:.1f}")
+
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(segments).encode()))
+                headers.append((b"x-process-time", str(total).encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            total = time.perf_counter() - started
+            request_timings.reset(token)
+
+            # Label by route template so path parameters don't explode cardinality
+            route = scope.get("route")
+            route_path = route.path if route else "unmatched"
+            http_request_duration.observe(
+                total, method=scope["method"], route=route_path, status=status_code
+            )
+
+            if settings.server_timing_log_sample_rate and random.random() < settings.server_timing_log_sample_rate:
+                logger.info(json.dumps({
+                    "event": "request_timing",
+                    "method": scope["method"],
+                    "route": route_path,
+                    "status": status_code,
+                    "total_ms": round(total * 1000, 2),
+                    "segments_ms": {name: round(duration * 1000, 2) for name, duration in timings.items()}
+                }))
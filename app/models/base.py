@@ -18,6 +18,13 @@ class PaginatedResponse(BaseModel):
     total_pages: int
 
 
+class CursorPaginatedResponse(BaseModel):
+    items: list
+    page_size: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
 class TimestampMixin(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, FrozenSet, List, Optional
 from enum import Enum
 from datetime import datetime
 from .base import TimestampMixin
@@ -15,6 +15,42 @@ class ConsignmentStatus(str, Enum):
     RETURNED = "returned"
 
 
+# Statuses each status may move to; anything else is rejected
+ALLOWED_STATUS_TRANSITIONS: Dict[ConsignmentStatus, FrozenSet[ConsignmentStatus]] = {
+    ConsignmentStatus.PENDING: frozenset({
+        ConsignmentStatus.IN_TRANSIT, ConsignmentStatus.OUT_FOR_DELIVERY,
+        ConsignmentStatus.LOST, ConsignmentStatus.RETURNED
+    }),
+    ConsignmentStatus.IN_TRANSIT: frozenset({
+        ConsignmentStatus.OUT_FOR_DELIVERY, ConsignmentStatus.DELIVERED,
+        ConsignmentStatus.DELIVERY_FAILED, ConsignmentStatus.LOST, ConsignmentStatus.RETURNED
+    }),
+    ConsignmentStatus.OUT_FOR_DELIVERY: frozenset({
+        ConsignmentStatus.DELIVERED, ConsignmentStatus.DELIVERY_FAILED,
+        ConsignmentStatus.IN_TRANSIT, ConsignmentStatus.LOST
+    }),
+    ConsignmentStatus.DELIVERY_FAILED: frozenset({
+        ConsignmentStatus.OUT_FOR_DELIVERY, ConsignmentStatus.IN_TRANSIT,
+        ConsignmentStatus.RETURNED, ConsignmentStatus.LOST
+    }),
+    ConsignmentStatus.LOST: frozenset({
+        ConsignmentStatus.IN_TRANSIT, ConsignmentStatus.RETURNED
+    }),
+    ConsignmentStatus.DELIVERED: frozenset({
+        ConsignmentStatus.RETURNED
+    }),
+    ConsignmentStatus.RETURNED: frozenset(),
+}
+
+
+def allowed_previous_statuses(to_status: ConsignmentStatus) -> List[str]:
+    """Statuses from which a move to to_status is allowed"""
+    return [
+        from_status.value for from_status, targets in ALLOWED_STATUS_TRANSITIONS.items()
+        if to_status in targets
+    ]
+
+
 class ConsignmentBase(BaseModel):
     sender_name: str
     sender_phone: str
@@ -32,6 +68,10 @@ class ConsignmentCreate(ConsignmentBase):
     destination_warehouse_id: str
 
 
+class ConsignmentBulkCreate(BaseModel):
+    items: List[ConsignmentCreate] = Field(..., min_length=1, max_length=5000)
+
+
 class ConsignmentUpdate(BaseModel):
     current_warehouse_id: Optional[str] = None
     destination_warehouse_id: Optional[str] = None
@@ -47,11 +87,31 @@ class ConsignmentResponse(ConsignmentBase, TimestampMixin):
     status: ConsignmentStatus
     assigned_to: Optional[str] = None
     delivered_at: Optional[datetime] = None
+    version: Optional[int] = None
 
 
 class ConsignmentStatusUpdate(BaseModel):
     status: ConsignmentStatus
     notes: Optional[str] = None
+    expected_version: Optional[int] = None
+
+
+class ConsignmentStatusBatchItem(BaseModel):
+    consignment_id: Optional[str] = None
+    tracking_number: Optional[str] = None
+    status: ConsignmentStatus
+    notes: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _one_identifier(self):
+        # Exactly one key, so an item can't silently resolve to a different row
+        if (self.consignment_id is None) == (self.tracking_number is None):
+            raise ValueError("Provide exactly one of consignment_id or tracking_number")
+        return self
+
+
+class ConsignmentStatusBatch(BaseModel):
+    items: List[ConsignmentStatusBatchItem] = Field(..., min_length=1, max_length=5000)
 
 
 class ConsignmentTransfer(BaseModel):
@@ -62,3 +122,53 @@ class ConsignmentTransfer(BaseModel):
 class ConsignmentAssign(BaseModel):
     assigned_to: str
     notes: Optional[str] = None
+
+
+class ConsignmentBulkItemResult(BaseModel):
+    index: int
+    success: bool
+    consignment: Optional[ConsignmentResponse] = None
+    error: Optional[str] = None
+
+
+class ConsignmentBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[ConsignmentBulkItemResult]
+
+
+class ConsignmentStatusBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    consignment_id: Optional[str] = None
+    tracking_number: Optional[str] = None
+    from_status: Optional[ConsignmentStatus] = None
+    status: Optional[ConsignmentStatus] = None
+    error: Optional[str] = None
+
+
+class ConsignmentStatusBatchResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[ConsignmentStatusBatchItemResult]
+
+
+class TrackingBatchRequest(BaseModel):
+    tracking_numbers: List[str] = Field(..., min_length=1, max_length=1000)
+    updated_since: Optional[datetime] = None
+
+
+class TrackingBatchResponse(BaseModel):
+    items: List[ConsignmentResponse]
+    not_found: List[str] = []
+
+
+class ConsignmentSearchResult(ConsignmentResponse):
+    rank: float
+
+
+class ConsignmentSearchResponse(BaseModel):
+    items: List[ConsignmentSearchResult]
+    page: int
+    page_size: int
+    has_more: bool
@@ -1,16 +1,58 @@
-from typing import List, Optional
-from app.database import db
+from typing import AsyncIterator, Dict, List, Optional
+from datetime import datetime
+from app.database import db, DatabaseOverloadedError
 from app.models.consignment import (
     ConsignmentCreate, ConsignmentUpdate, ConsignmentResponse,
-    ConsignmentStatus, ConsignmentStatusUpdate
+    ConsignmentStatus, ConsignmentStatusUpdate, allowed_previous_statuses,
+    ALLOWED_STATUS_TRANSITIONS, ConsignmentBulkItemResult, ConsignmentBulkResponse,
+    ConsignmentStatusBatchItem, ConsignmentStatusBatchItemResult, ConsignmentStatusBatchResponse,
+    TrackingBatchResponse
 )
-from app.models.base import PaginatedResponse
+from app.services.rollup_service import (
+    DashboardRollupService, ROLLUP_INSERT, ROLLUP_ON_CONFLICT
+)
+from app.services.notification_service import STATUS_NOTIFY
+from app.core.cache import TTLCache
+from app.core.utils import encode_cursor, decode_cursor
+from app.core.serialization import columns_for
+from app.config import settings
 from fastapi import HTTPException
+import asyncio
+import time
 import uuid
 import secrets
 import string
 
 
+# Listing rows are returned raw, so select exactly the response model's fields
+CONSIGNMENT_COLUMNS = columns_for(ConsignmentResponse)
+
+# Export header, in the same order as CONSIGNMENT_COLUMNS
+EXPORT_COLUMNS = list(ConsignmentResponse.model_fields)
+
+# Search expressions; must match the indexes in migrations/010_consignment_search.sql
+SEARCH_TEXT = """lower(
+    coalesce(sender_name, '') || ' ' || coalesce(sender_phone, '') || ' ' ||
+    coalesce(sender_address, '') || ' ' || coalesce(receiver_name, '') || ' ' ||
+    coalesce(receiver_phone, '') || ' ' || coalesce(receiver_address, '')
+)"""
+
+SEARCH_DOCUMENT = """to_tsvector('simple',
+    coalesce(sender_name, '') || ' ' || coalesce(sender_address, '') || ' ' ||
+    coalesce(receiver_name, '') || ' ' || coalesce(receiver_address, '')
+)"""
+
+# Listing totals keyed by filter, so paging doesn't re-count every request
+count_cache = TTLCache(max_size=1024, ttl=settings.count_cache_ttl_seconds)
+
+# Public tracking lookups; unknown numbers are cached as None
+tracking_cache = TTLCache(
+    max_size=settings.tracking_cache_max_size,
+    ttl=settings.tracking_cache_ttl_seconds
+)
+_NOT_CACHED = object()
+
+
 class ConsignmentService:
     @staticmethod
     def generate_tracking_number() -> str:
@@ -35,27 +77,156 @@ class ConsignmentService:
         """
 
         try:
-            result = await db.fetchrow(
-                query,
-                consignment_id,
-                tracking_number,
-                consignment.sender_name,
-                consignment.sender_phone,
-                consignment.sender_address,
-                consignment.receiver_name,
-                consignment.receiver_phone,
-                consignment.receiver_address,
-                consignment.weight,
-                consignment.dimensions,
-                consignment.value,
-                consignment.current_warehouse_id,
-                consignment.destination_warehouse_id,
-                ConsignmentStatus.PENDING
-            )
+            async with db.transaction() as connection:
+                result = await connection.fetchrow(
+                    query,
+                    consignment_id,
+                    tracking_number,
+                    consignment.sender_name,
+                    consignment.sender_phone,
+                    consignment.sender_address,
+                    consignment.receiver_name,
+                    consignment.receiver_phone,
+                    consignment.receiver_address,
+                    consignment.weight,
+                    consignment.dimensions,
+                    consignment.value,
+                    consignment.current_warehouse_id,
+                    consignment.destination_warehouse_id,
+                    ConsignmentStatus.PENDING
+                )
+                await DashboardRollupService.apply(
+                    connection, [DashboardRollupService.created_delta(result)]
+                )
+            tracking_cache.invalidate(tracking_number)
             return ConsignmentResponse(**dict(result))
+        except DatabaseOverloadedError:
+            # Surfaced as 503 + Retry-After, not a client error
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error creating consignment: {str(e)}")
 
+    @staticmethod
+    async def allocate_tracking_numbers(count: int, connection=None) -> List[str]:
+        """Generate tracking numbers unique within the batch and against existing rows"""
+        allocated = set()
+        pending = count
+
+        while pending:
+            candidates = set()
+            while len(candidates) < pending:
+                candidate = ConsignmentService.generate_tracking_number()
+                if candidate not in allocated:
+                    candidates.add(candidate)
+
+            # The registry also covers archived consignments
+            taken = await (connection or db).fetch(
+                """
+                SELECT tracking_number FROM consignment_tracking_numbers
+                WHERE tracking_number = ANY($1::text[])
+                """,
+                list(candidates)
+            )
+            candidates -= {row['tracking_number'] for row in taken}
+            allocated |= candidates
+            pending = count - len(allocated)
+
+        return list(allocated)
+
+    @staticmethod
+    async def create_consignments_bulk(consignments: List[ConsignmentCreate]) -> ConsignmentBulkResponse:
+        """Create a batch of consignments in one transaction"""
+        results: List[Optional[ConsignmentBulkItemResult]] = [None] * len(consignments)
+
+        # Reject items pointing at unknown or inactive warehouses up front
+        warehouse_ids = {c.current_warehouse_id for c in consignments} | {
+            c.destination_warehouse_id for c in consignments
+        }
+        rows = await db.fetch(
+            "SELECT id FROM warehouses WHERE id = ANY($1::text[]) AND is_active = true",
+            list(warehouse_ids)
+        )
+        active_warehouses = {row['id'] for row in rows}
+
+        accepted = []
+        for index, consignment in enumerate(consignments):
+            missing = [
+                warehouse_id for warehouse_id in (
+                    consignment.current_warehouse_id, consignment.destination_warehouse_id
+                ) if warehouse_id not in active_warehouses
+            ]
+            if missing:
+                results[index] = ConsignmentBulkItemResult(
+                    index=index, success=False, error=f"Unknown warehouse: {', '.join(missing)}"
+                )
+            else:
+                accepted.append((index, consignment))
+
+        if accepted:
+            columns = [
+                "id", "tracking_number", "sender_name", "sender_phone", "sender_address",
+                "receiver_name", "receiver_phone", "receiver_address", "weight", "dimensions",
+                "value", "current_warehouse_id", "destination_warehouse_id", "status"
+            ]
+
+            try:
+                async with db.transaction() as connection:
+                    tracking_numbers = await ConsignmentService.allocate_tracking_numbers(
+                        len(accepted), connection
+                    )
+                    index_by_tracking = {}
+                    records = []
+                    for (index, consignment), tracking_number in zip(accepted, tracking_numbers):
+                        index_by_tracking[tracking_number] = index
+                        records.append((
+                            str(uuid.uuid4()),
+                            tracking_number,
+                            consignment.sender_name,
+                            consignment.sender_phone,
+                            consignment.sender_address,
+                            consignment.receiver_name,
+                            consignment.receiver_phone,
+                            consignment.receiver_address,
+                            consignment.weight,
+                            consignment.dimensions,
+                            consignment.value,
+                            consignment.current_warehouse_id,
+                            consignment.destination_warehouse_id,
+                            ConsignmentStatus.PENDING.value
+                        ))
+
+                    # COPY the whole batch, then read back generated defaults
+                    await connection.copy_records_to_table(
+                        "consignments", records=records, columns=columns
+                    )
+                    created = await connection.fetch(
+                        "SELECT * FROM consignments WHERE tracking_number = ANY($1::text[])",
+                        tracking_numbers
+                    )
+
+                    await DashboardRollupService.apply(
+                        connection, [DashboardRollupService.created_delta(row) for row in created]
+                    )
+            except DatabaseOverloadedError:
+                # Surfaced as 503 + Retry-After, not a client error
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Error creating consignments: {str(e)}")
+
+            for row in created:
+                tracking_cache.invalidate(row['tracking_number'])
+                index = index_by_tracking[row['tracking_number']]
+                results[index] = ConsignmentBulkItemResult(
+                    index=index, success=True, consignment=ConsignmentResponse(**dict(row))
+                )
+
+        created_count = sum(1 for result in results if result.success)
+        return ConsignmentBulkResponse(
+            created=created_count,
+            failed=len(results) - created_count,
+            results=results
+        )
+
     @staticmethod
     async def get_consignment(consignment_id: str) -> Optional[ConsignmentResponse]:
         """Get consignment by ID"""
@@ -69,24 +240,65 @@ class ConsignmentService:
     @staticmethod
     async def get_consignment_by_tracking(tracking_number: str) -> Optional[ConsignmentResponse]:
         """Get consignment by tracking number"""
+        cached = tracking_cache.get(tracking_number, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+
+        # Primary only: this refills the cache right after post-commit invalidation
+        loaded_since = time.monotonic()
         query = "SELECT * FROM consignments WHERE tracking_number = $1"
-        result = await db.fetchrow(query, tracking_number)
+        result = await db.fetchrow(query, tracking_number, name="consignment_by_tracking")
 
         if result:
-            return ConsignmentResponse(**dict(result))
+            consignment = ConsignmentResponse(**dict(result))
+            tracking_cache.set(tracking_number, consignment, loaded_since=loaded_since)
+            return consignment
+
+        # Negative entry so repeated unknown numbers don't reach the database
+        tracking_cache.set(
+            tracking_number, None, ttl=settings.tracking_negative_cache_ttl_seconds, loaded_since=loaded_since
+        )
         return None
 
     @staticmethod
-    async def get_consignments(
+    async def get_consignments_by_tracking(
+            tracking_numbers: List[str],
+            updated_since: Optional[datetime] = None
+    ) -> TrackingBatchResponse:
+        """Resolve many tracking numbers in one query"""
+        tracking_numbers = list(dict.fromkeys(tracking_numbers))
+
+        query = """
+        SELECT * FROM consignments
+        WHERE tracking_number = ANY($1::text[])
+        AND ($2::timestamptz IS NULL OR updated_at > $2)
+        """
+        # Primary only: a lagging replica would make updated_since polls miss changes for good
+        results = await db.fetch(query, tracking_numbers, updated_since, name="consignments_by_tracking_batch")
+        items = [ConsignmentResponse(**dict(row)) for row in results]
+
+        # With updated_since, absent numbers may simply be unchanged
+        not_found = []
+        if updated_since is None:
+            found = {item.tracking_number for item in items}
+            not_found = [number for number in tracking_numbers if number not in found]
+
+        return TrackingBatchResponse(items=items, not_found=not_found)
+
+    @staticmethod
+    def tracking_etag(consignment: ConsignmentResponse) -> str:
+        """Validator for a tracking response; changes whenever the row does"""
+        stamp = consignment.updated_at.isoformat() if consignment.updated_at else ""
+        return f'W/"{consignment.id}-{consignment.version or 0}-{stamp}"'
+
+    @staticmethod
+    def _build_filters(
             warehouse_id: Optional[str] = None,
             status: Optional[ConsignmentStatus] = None,
-            page: int = 1,
-            page_size: int = 20
-    ) -> PaginatedResponse:
-        """Get paginated consignments with filters"""
-        offset = (page - 1) * page_size
-
-        # Build WHERE clause
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None
+    ) -> tuple:
+        """Build WHERE conditions and params shared by the listing queries"""
         where_conditions = []
         params = []
         param_count = 1
@@ -101,82 +313,454 @@ class ConsignmentService:
             params.append(status.value)
             param_count += 1
 
+        if created_from:
+            where_conditions.append(f"created_at >= ${param_count}")
+            params.append(created_from)
+            param_count += 1
+
+        if created_to:
+            where_conditions.append(f"created_at < ${param_count}")
+            params.append(created_to)
+            param_count += 1
+
+        return where_conditions, params
+
+    @staticmethod
+    async def count_consignments(
+            warehouse_id: Optional[str] = None,
+            status: Optional[ConsignmentStatus] = None,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None
+    ) -> int:
+        """Count consignments for a filter, cached for a short TTL"""
+        cache_key = (warehouse_id, status.value if status else None, created_from, created_to)
+        total = count_cache.get(cache_key)
+        if total is not None:
+            return total
+
+        where_conditions, params = ConsignmentService._build_filters(
+            warehouse_id, status, created_from, created_to
+        )
+        where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+        result = await db.fetchrow(
+            f"SELECT COUNT(*) FROM consignments {where_clause}", *params, name="consignments_count", replica=True
+        )
+        total = result['count']
+        count_cache.set(cache_key, total)
+        return total
+
+    @staticmethod
+    async def get_consignments(
+            warehouse_id: Optional[str] = None,
+            status: Optional[ConsignmentStatus] = None,
+            page: int = 1,
+            page_size: int = 20,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None
+    ) -> Dict:
+        """Get paginated consignments with filters, as plain rows for RecordJSONResponse"""
+        offset = (page - 1) * page_size
+
+        # Build WHERE clause
+        where_conditions, params = ConsignmentService._build_filters(
+            warehouse_id, status, created_from, created_to
+        )
+        param_count = len(params) + 1
+
         where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
 
         # Count query
-        count_query = f"SELECT COUNT(*) FROM consignments {where_clause}"
-        total = await db.fetchrow(count_query, *params)
+        total = await ConsignmentService.count_consignments(
+            warehouse_id, status, created_from, created_to
+        )
 
         # Data query
         query = f"""
-        SELECT * FROM consignments 
+        SELECT {CONSIGNMENT_COLUMNS} FROM consignments 
         {where_clause}
         ORDER BY created_at DESC 
         LIMIT ${param_count} OFFSET ${param_count + 1}
         """
         params.extend([page_size, offset])
 
-        results = await db.fetch(query, *params)
-        consignments = [ConsignmentResponse(**dict(row)) for row in results]
+        results = await db.fetch(query, *params, name="consignments_page", replica=True)
+
+        return {
+            "items": [dict(row) for row in results],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size
+        }
 
-        return PaginatedResponse(
-            items=consignments,
-            total=total['count'],
-            page=page,
-            page_size=page_size,
-            total_pages=(total['count'] + page_size - 1) // page_size
+    @staticmethod
+    async def get_consignments_after(
+            warehouse_id: Optional[str] = None,
+            status: Optional[ConsignmentStatus] = None,
+            cursor: Optional[str] = None,
+            page_size: int = 20,
+            include_total: bool = False,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None
+    ) -> Dict:
+        """Get consignments page after a keyset cursor on (created_at, id), as plain rows"""
+        where_conditions, params = ConsignmentService._build_filters(
+            warehouse_id, status, created_from, created_to
+        )
+        param_count = len(params) + 1
+
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            where_conditions.append(f"(created_at, id) < (${param_count}, ${param_count + 1})")
+            params.extend([created_at, row_id])
+            param_count += 2
+
+        where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+        # Fetch one extra row to know whether another page exists
+        query = f"""
+        SELECT {CONSIGNMENT_COLUMNS} FROM consignments 
+        {where_clause}
+        ORDER BY created_at DESC, id DESC 
+        LIMIT ${param_count}
+        """
+        params.append(page_size + 1)
+
+        results = await db.fetch(query, *params, name="consignments_keyset_page", replica=True)
+        rows = results[:page_size]
+
+        next_cursor = None
+        if len(results) > page_size:
+            last = rows[-1]
+            next_cursor = encode_cursor(last['created_at'], last['id'])
+
+        total = None
+        if include_total:
+            total = await ConsignmentService.count_consignments(
+                warehouse_id, status, created_from, created_to
+            )
+
+        return {
+            "items": [dict(row) for row in rows],
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "total": total
+        }
+
+    @staticmethod
+    async def search_consignments(
+            search: str,
+            warehouse_id: Optional[str] = None,
+            page: int = 1,
+            page_size: int = 20
+    ) -> Dict:
+        """Ranked fuzzy search over sender/receiver names, phones and addresses"""
+        # Word matches use the full-text index, fragments and typos the trigram
+        # index; rank by whichever scores higher. Fetch one extra row instead of
+        # counting every fuzzy match.
+        query = f"""
+        SELECT {CONSIGNMENT_COLUMNS}, rank
+        FROM (
+            SELECT *, GREATEST(
+                ts_rank({SEARCH_DOCUMENT}, plainto_tsquery('simple', $1)),
+                word_similarity(lower($1), {SEARCH_TEXT})
+            ) as rank
+            FROM consignments
+            WHERE ({SEARCH_DOCUMENT} @@ plainto_tsquery('simple', $1)
+                   OR lower($1) <% {SEARCH_TEXT})
+            AND ($2::text IS NULL OR current_warehouse_id = $2)
+        ) matches
+        ORDER BY rank DESC, created_at DESC, id DESC
+        LIMIT $3 OFFSET $4
+        """
+
+        rows = await db.fetch(
+            query, search, warehouse_id, page_size + 1, (page - 1) * page_size,
+            name="consignments_search", replica=True
         )
 
+        return {
+            "items": [dict(row) for row in rows[:page_size]],
+            "page": page,
+            "page_size": page_size,
+            "has_more": len(rows) > page_size
+        }
+
+    @staticmethod
+    async def stream_consignments(
+            warehouse_id: Optional[str] = None,
+            status: Optional[ConsignmentStatus] = None,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None
+    ) -> AsyncIterator:
+        """Iterate over every matching consignment through a server-side cursor"""
+        where_conditions, params = ConsignmentService._build_filters(
+            warehouse_id, status, created_from, created_to
+        )
+        where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+        query = f"""
+        SELECT {CONSIGNMENT_COLUMNS} FROM consignments 
+        {where_clause}
+        ORDER BY created_at DESC, id DESC
+        """
+
+        async for row in db.iterate(query, *params, replica=True):
+            yield row
+
     @staticmethod
     async def update_consignment_status(
             consignment_id: str,
             status_update: ConsignmentStatusUpdate,
             user_id: str
     ) -> Optional[ConsignmentResponse]:
-        """Update consignment status"""
-        # Get current consignment
-        current = await ConsignmentService.get_consignment(consignment_id)
-        if not current:
-            return None
-
-        # Update consignment
-        query = """
-        UPDATE consignments 
-        SET status = $1, updated_at = NOW()
-        WHERE id = $2
-        RETURNING *
+        """Update consignment status in one atomic statement"""
+        # Lock the current row without waiting, move it only along an allowed
+        # transition at the expected version, log it and adjust the rollup
+        query = f"""
+        WITH prev AS (
+            SELECT id, status, version, delivered_at
+            FROM consignments
+            WHERE id = $1
+            FOR UPDATE SKIP LOCKED
+        ),
+        upd AS (
+            UPDATE consignments c
+            SET status = $2,
+                version = c.version + 1,
+                delivered_at = CASE WHEN $2 = 'delivered' THEN NOW() ELSE c.delivered_at END,
+                updated_at = NOW()
+            FROM prev
+            WHERE c.id = prev.id
+            AND prev.status = ANY($3::text[])
+            AND ($4::int IS NULL OR prev.version = $4)
+            RETURNING c.*, prev.status AS previous_status, prev.delivered_at AS previous_delivered_at
+        ),
+        log AS (
+            INSERT INTO consignment_status_log (
+                consignment_id, from_status, to_status, changed_by, notes
+            )
+            SELECT id, previous_status, status, $5, $6 FROM upd
+            RETURNING consignment_id, from_status, to_status, notes, created_at
+        ),
+        rollup AS (
+            {ROLLUP_INSERT}
+            SELECT upd.current_warehouse_id, upd.created_at::date, d.status,
+                   d.consignment_count, d.delivered_count, d.delivery_seconds
+            FROM upd
+            CROSS JOIN LATERAL (VALUES
+                (
+                    upd.previous_status, -1,
+                    CASE WHEN upd.previous_status = 'delivered' AND upd.previous_delivered_at IS NOT NULL
+                        THEN -1 ELSE 0 END,
+                    CASE WHEN upd.previous_status = 'delivered' AND upd.previous_delivered_at IS NOT NULL
+                        THEN -EXTRACT(EPOCH FROM (upd.previous_delivered_at - upd.created_at))::float8
+                        ELSE 0 END
+                ),
+                (
+                    upd.status, 1,
+                    CASE WHEN upd.status = 'delivered' AND upd.delivered_at IS NOT NULL THEN 1 ELSE 0 END,
+                    CASE WHEN upd.status = 'delivered' AND upd.delivered_at IS NOT NULL
+                        THEN EXTRACT(EPOCH FROM (upd.delivered_at - upd.created_at))::float8
+                        ELSE 0 END
+                )
+            ) AS d(status, consignment_count, delivered_count, delivery_seconds)
+            {ROLLUP_ON_CONFLICT}
+        )
+        SELECT c.*, {STATUS_NOTIFY} AS notified
+        FROM upd c
+        JOIN log ON log.consignment_id = c.id
         """
 
-        result = await db.fetchrow(query, status_update.status.value, consignment_id)
+        for attempt in range(2):
+            result = await db.fetchrow(
+                query,
+                consignment_id,
+                status_update.status.value,
+                allowed_previous_statuses(status_update.status),
+                status_update.expected_version,
+                user_id,
+                status_update.notes,
+                name="consignment_status_transition"
+            )
+
+            if result:
+                row = dict(result)
+                row.pop('previous_status')
+                row.pop('previous_delivered_at')
+                row.pop('notified')
+                tracking_cache.invalidate(row['tracking_number'])
+                return ConsignmentResponse(**row)
 
-        if result:
-            # Log status change
-            await ConsignmentService.log_status_change(
-                consignment_id, current.status, status_update.status, user_id, status_update.notes
+            # Nothing moved: work out why; the probe only skips, never waits for, a row lock
+            current = await db.fetchrow(
+                """
+                SELECT status, version, NOT EXISTS (
+                    SELECT 1 FROM consignments l
+                    WHERE l.id = c.id
+                    FOR KEY SHARE SKIP LOCKED
+                ) as locked
+                FROM consignments c
+                WHERE c.id = $1
+                """,
+                consignment_id,
+                name="consignment_status_probe"
+            )
+            if not current:
+                return None
+            if not current['locked']:
+                break
+
+            # Held by another transaction (e.g. a batch update): retry once, then ask the client to
+            if attempt == 0:
+                await asyncio.sleep(settings.status_lock_retry_seconds)
+        else:
+            raise HTTPException(
+                status_code=503,
+                detail="Consignment is being updated by another request, please retry",
+                headers={"Retry-After": str(settings.db_retry_after_seconds)}
+            )
+
+        if current['status'] not in allowed_previous_statuses(status_update.status):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Cannot change status from {current['status']} to {status_update.status.value}"
+            )
+
+        if status_update.expected_version is not None and current['version'] != status_update.expected_version:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Version mismatch: expected {status_update.expected_version}, current {current['version']}"
             )
-            return ConsignmentResponse(**dict(result))
-        return None
+
+        # Changed between the update and the probe
+        raise HTTPException(
+            status_code=409,
+            detail="Consignment changed while updating, please retry"
+        )
 
     @staticmethod
-    async def log_status_change(
-            consignment_id: str,
-            from_status: ConsignmentStatus,
-            to_status: ConsignmentStatus,
-            user_id: str,
-            notes: Optional[str] = None
-    ):
-        """Log consignment status changes"""
-        query = """
-        INSERT INTO consignment_status_log (
-            consignment_id, from_status, to_status, changed_by, notes
-        ) VALUES ($1, $2, $3, $4, $5)
-        """
+    async def update_consignment_statuses_batch(
+            items: List[ConsignmentStatusBatchItem],
+            user_id: str
+    ) -> ConsignmentStatusBatchResponse:
+        """Apply a batch of status updates in one transaction"""
+        results: List[ConsignmentStatusBatchItemResult] = []
+
+        ids = [item.consignment_id for item in items if item.consignment_id]
+        tracking_numbers = [item.tracking_number for item in items if item.tracking_number]
+
+        async with db.transaction() as connection:
+            # Lock every affected row once, in a stable order
+            rows = await connection.fetch(
+                """
+                SELECT * FROM consignments
+                WHERE id = ANY($1::text[]) OR tracking_number = ANY($2::text[])
+                ORDER BY id
+                FOR UPDATE
+                """,
+                ids,
+                tracking_numbers
+            )
+            originals = {row['id']: row for row in rows}
+            id_by_tracking = {row['tracking_number']: row['id'] for row in rows}
 
-        await db.execute(
-            query,
-            consignment_id,
-            from_status.value,
-            to_status.value,
-            user_id,
-            notes
-        )
\ No newline at end of file
+            current_status = {row_id: row['status'] for row_id, row in originals.items()}
+            log_entries = []
+
+            for index, item in enumerate(items):
+                row_id = item.consignment_id or id_by_tracking.get(item.tracking_number)
+                if row_id not in originals:
+                    results.append(ConsignmentStatusBatchItemResult(
+                        index=index,
+                        success=False,
+                        consignment_id=item.consignment_id,
+                        tracking_number=item.tracking_number,
+                        error="Consignment not found"
+                    ))
+                    continue
+
+                from_status = current_status[row_id]
+                if item.status not in ALLOWED_STATUS_TRANSITIONS[ConsignmentStatus(from_status)]:
+                    results.append(ConsignmentStatusBatchItemResult(
+                        index=index,
+                        success=False,
+                        consignment_id=row_id,
+                        tracking_number=originals[row_id]['tracking_number'],
+                        from_status=from_status,
+                        status=item.status,
+                        error=f"Cannot change status from {from_status} to {item.status.value}"
+                    ))
+                    continue
+
+                current_status[row_id] = item.status.value
+                log_entries.append((row_id, from_status, item.status.value, item.notes))
+                results.append(ConsignmentStatusBatchItemResult(
+                    index=index,
+                    success=True,
+                    consignment_id=row_id,
+                    tracking_number=originals[row_id]['tracking_number'],
+                    from_status=from_status,
+                    status=item.status
+                ))
+
+            if log_entries:
+                changed_ids = list({entry[0] for entry in log_entries})
+                updated = await connection.fetch(
+                    """
+                    UPDATE consignments c
+                    SET status = v.status,
+                        version = c.version + 1,
+                        delivered_at = CASE WHEN v.status = 'delivered' THEN NOW() ELSE c.delivered_at END,
+                        updated_at = NOW()
+                    FROM unnest($1::text[], $2::text[]) AS v(id, status)
+                    WHERE c.id = v.id
+                    RETURNING c.*
+                    """,
+                    changed_ids,
+                    [current_status[row_id] for row_id in changed_ids]
+                )
+
+                entry_columns = list(zip(*log_entries))
+                await connection.execute(
+                    f"""
+                    WITH log AS (
+                        INSERT INTO consignment_status_log (
+                            consignment_id, from_status, to_status, changed_by, notes
+                        )
+                        SELECT consignment_id, from_status, to_status, $4, notes
+                        FROM unnest($1::text[], $2::text[], $3::text[], $5::text[])
+                            AS v(consignment_id, from_status, to_status, notes)
+                        RETURNING consignment_id, from_status, to_status, notes, created_at
+                    )
+                    SELECT {STATUS_NOTIFY}
+                    FROM log
+                    JOIN consignments c ON c.id = log.consignment_id
+                    """,
+                    list(entry_columns[0]),
+                    list(entry_columns[1]),
+                    list(entry_columns[2]),
+                    user_id,
+                    list(entry_columns[3])
+                )
+
+                deltas = []
+                for row in updated:
+                    original = originals[row['id']]
+                    deltas.extend(DashboardRollupService.status_deltas(
+                        row, original['status'], original['delivered_at']
+                    ))
+                await DashboardRollupService.apply(connection, deltas)
+
+        # Drop cached tracking responses once the changes are committed
+        for result in results:
+            if result.success:
+                tracking_cache.invalidate(result.tracking_number)
+
+        updated_count = sum(1 for result in results if result.success)
+        return ConsignmentStatusBatchResponse(
+            updated=updated_count,
+            failed=len(results) - updated_count,
+            results=results
+        )
@@ -1,82 +1,84 @@
+import asyncio
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from app.config import settings
 from app.database import db
+from app.core.cache import SingleFlightCache
+
+# Aggregations keyed by (panel, warehouse_id, days); shared across concurrent viewers
+dashboard_cache = SingleFlightCache(
+    max_size=settings.dashboard_cache_max_size,
+    ttl=settings.dashboard_cache_ttl_seconds,
+    stale_ttl=settings.dashboard_cache_stale_seconds
+)
 
 
 class DashboardService:
     @staticmethod
     async def get_dashboard_stats(warehouse_id: Optional[str] = None) -> Dict:
         """Get dashboard statistics"""
+        return await dashboard_cache.get_or_load(
+            ("stats", warehouse_id, None),
+            lambda: DashboardService._load_dashboard_stats(warehouse_id)
+        )
 
-        # Base condition for warehouse filtering
-        warehouse_condition = f"AND current_warehouse_id = '{warehouse_id}'" if warehouse_id else ""
-
-        # Total consignments
-        total_query = f"SELECT COUNT(*) as count FROM consignments WHERE 1=1 {warehouse_condition}"
-        total_result = await db.fetchrow(total_query)
-
-        # Pending consignments
-        pending_query = f"SELECT COUNT(*) as count FROM consignments WHERE status = 'pending' {warehouse_condition}"
-        pending_result = await db.fetchrow(pending_query)
-
-        # In transit consignments
-        in_transit_query = f"SELECT COUNT(*) as count FROM consignments WHERE status = 'in_transit' {warehouse_condition}"
-        in_transit_result = await db.fetchrow(in_transit_query)
-
-        # Delivered consignments
-        delivered_query = f"SELECT COUNT(*) as count FROM consignments WHERE status = 'delivered' {warehouse_condition}"
-        delivered_result = await db.fetchrow(delivered_query)
-
-        # Today's consignments
-        today_query = f"""
-        SELECT COUNT(*) as count FROM consignments 
-        WHERE DATE(created_at) = CURRENT_DATE {warehouse_condition}
-        """
-        today_result = await db.fetchrow(today_query)
-
-        # This week's delivered
-        week_delivered_query = f"""
-        SELECT COUNT(*) as count FROM consignments 
-        WHERE status = 'delivered' 
-        AND created_at >= CURRENT_DATE - INTERVAL '7 days' {warehouse_condition}
+    @staticmethod
+    async def _load_dashboard_stats(warehouse_id: Optional[str]) -> Dict:
+        # Read from the daily rollup; warehouse is a bind parameter so the plan is reused
+        query = """
+        SELECT
+            COALESCE(SUM(consignment_count), 0) as total_consignments,
+            COALESCE(SUM(consignment_count) FILTER (WHERE status = 'pending'), 0) as pending_consignments,
+            COALESCE(SUM(consignment_count) FILTER (WHERE status = 'in_transit'), 0) as in_transit_consignments,
+            COALESCE(SUM(consignment_count) FILTER (WHERE status = 'delivered'), 0) as delivered_consignments,
+            COALESCE(SUM(consignment_count) FILTER (WHERE day = CURRENT_DATE), 0) as today_consignments,
+            COALESCE(SUM(consignment_count) FILTER (
+                WHERE status = 'delivered'
+                AND day >= CURRENT_DATE - 7
+            ), 0) as week_delivered
+        FROM consignment_daily_rollup
+        WHERE ($1::text IS NULL OR warehouse_id = $1)
         """
-        week_delivered_result = await db.fetchrow(week_delivered_query)
+        result = await db.fetchrow(query, warehouse_id, name="dashboard_stats", replica=True)
 
         return {
-            "total_consignments": total_result['count'],
-            "pending_consignments": pending_result['count'],
-            "in_transit_consignments": in_transit_result['count'],
-            "delivered_consignments": delivered_result['count'],
-            "today_consignments": today_result['count'],
-            "week_delivered": week_delivered_result['count']
+            "total_consignments": result['total_consignments'],
+            "pending_consignments": result['pending_consignments'],
+            "in_transit_consignments": result['in_transit_consignments'],
+            "delivered_consignments": result['delivered_consignments'],
+            "today_consignments": result['today_consignments'],
+            "week_delivered": result['week_delivered']
         }
 
     @staticmethod
     async def get_consignments_by_status(warehouse_id: Optional[str] = None, days: int = 30) -> List[Dict]:
         """Get consignments grouped by status"""
+        return await dashboard_cache.get_or_load(
+            ("by_status", warehouse_id, days),
+            lambda: DashboardService._load_consignments_by_status(warehouse_id, days)
+        )
 
-        warehouse_condition = f"AND current_warehouse_id = '{warehouse_id}'" if warehouse_id else ""
-
-        query = f"""
+    @staticmethod
+    async def _load_consignments_by_status(warehouse_id: Optional[str], days: int) -> List[Dict]:
+        query = """
         SELECT 
             status,
-            COUNT(*) as count
-        FROM consignments 
-        WHERE created_at >= CURRENT_DATE - INTERVAL '{days} days' {warehouse_condition}
+            SUM(consignment_count) as count
+        FROM consignment_daily_rollup 
+        WHERE day >= CURRENT_DATE - $2::int
+        AND ($1::text IS NULL OR warehouse_id = $1)
         GROUP BY status
+        HAVING SUM(consignment_count) > 0
         ORDER BY count DESC
         """
 
-        results = await db.fetch(query)
+        results = await db.fetch(query, warehouse_id, days, name="dashboard_by_status", replica=True)
         return [{"status": row['status'], "count": row['count']} for row in results]
 
     @staticmethod
     async def get_recent_activities(warehouse_id: Optional[str] = None, limit: int = 10) -> List[Dict]:
         """Get recent activities"""
-
-        warehouse_condition = f"AND c.current_warehouse_id = '{warehouse_id}'" if warehouse_id else ""
-
-        query = f"""
+        query = """
         SELECT 
             csl.consignment_id,
             c.tracking_number,
@@ -86,52 +88,43 @@ class DashboardService:
             csl.notes
         FROM consignment_status_log csl
         JOIN consignments c ON csl.consignment_id = c.id
-        WHERE 1=1 {warehouse_condition}
+        WHERE ($1::text IS NULL OR c.current_warehouse_id = $1)
         ORDER BY csl.created_at DESC
-        LIMIT {limit}
+        LIMIT $2::int
         """
 
-        results = await db.fetch(query)
+        results = await db.fetch(query, warehouse_id, limit, name="dashboard_recent_activities", replica=True)
         return [dict(row) for row in results]
 
     @staticmethod
     async def get_performance_metrics(warehouse_id: Optional[str] = None, days: int = 30) -> Dict:
         """Get performance metrics"""
+        return await dashboard_cache.get_or_load(
+            ("performance", warehouse_id, days),
+            lambda: DashboardService._load_performance_metrics(warehouse_id, days)
+        )
 
-        warehouse_condition = f"AND current_warehouse_id = '{warehouse_id}'" if warehouse_id else ""
-
-        # Delivery success rate
-        total_query = f"""
-        SELECT COUNT(*) as count FROM consignments 
-        WHERE created_at >= CURRENT_DATE - INTERVAL '{days} days' 
-        AND status IN ('delivered', 'delivery_failed', 'lost') {warehouse_condition}
-        """
-
-        delivered_query = f"""
-        SELECT COUNT(*) as count FROM consignments 
-        WHERE created_at >= CURRENT_DATE - INTERVAL '{days} days' 
-        AND status = 'delivered' {warehouse_condition}
+    @staticmethod
+    async def _load_performance_metrics(warehouse_id: Optional[str], days: int) -> Dict:
+        # Success rate and average delivery time from the rollup counters
+        query = """
+        SELECT
+            SUM(consignment_count) FILTER (
+                WHERE status IN ('delivered', 'delivery_failed', 'lost')
+            ) as total_processed,
+            SUM(consignment_count) FILTER (WHERE status = 'delivered') as successfully_delivered,
+            SUM(delivery_seconds) / NULLIF(SUM(delivered_count), 0) / 3600 as avg_hours
+        FROM consignment_daily_rollup
+        WHERE day >= CURRENT_DATE - $2::int
+        AND ($1::text IS NULL OR warehouse_id = $1)
         """
+        result = await db.fetchrow(query, warehouse_id, days, name="dashboard_performance", replica=True)
 
-        total_result = await db.fetchrow(total_query)
-        delivered_result = await db.fetchrow(delivered_query)
-
-        total_final = total_result['count'] or 0
-        delivered_final = delivered_result['count'] or 0
+        total_final = result['total_processed'] or 0
+        delivered_final = result['successfully_delivered'] or 0
 
         success_rate = (delivered_final / total_final * 100) if total_final > 0 else 0
-
-        # Average delivery time
-        avg_delivery_query = f"""
-        SELECT AVG(EXTRACT(EPOCH FROM (delivered_at - created_at))/3600) as avg_hours
-        FROM consignments 
-        WHERE status = 'delivered' 
-        AND delivered_at IS NOT NULL
-        AND created_at >= CURRENT_DATE - INTERVAL '{days} days' {warehouse_condition}
-        """
-
-        avg_delivery_result = await db.fetchrow(avg_delivery_query)
-        avg_delivery_hours = avg_delivery_result['avg_hours'] or 0
+        avg_delivery_hours = result['avg_hours'] or 0
 
         return {
             "delivery_success_rate": round(success_rate, 2),
@@ -143,19 +136,51 @@ class DashboardService:
     @staticmethod
     async def get_delivery_trends(warehouse_id: Optional[str] = None, days: int = 30) -> List[Dict]:
         """Get delivery trends over time"""
+        return await dashboard_cache.get_or_load(
+            ("trends", warehouse_id, days),
+            lambda: DashboardService._load_delivery_trends(warehouse_id, days)
+        )
 
-        warehouse_condition = f"AND current_warehouse_id = '{warehouse_id}'" if warehouse_id else ""
-
-        query = f"""
+    @staticmethod
+    async def _load_delivery_trends(warehouse_id: Optional[str], days: int) -> List[Dict]:
+        query = """
         SELECT 
-            DATE(created_at) as date,
-            COUNT(*) as total_consignments,
-            COUNT(CASE WHEN status = 'delivered' THEN 1 END) as delivered_consignments
-        FROM consignments 
-        WHERE created_at >= CURRENT_DATE - INTERVAL '{days} days' {warehouse_condition}
-        GROUP BY DATE(created_at)
+            day as date,
+            SUM(consignment_count) as total_consignments,
+            COALESCE(SUM(consignment_count) FILTER (WHERE status = 'delivered'), 0) as delivered_consignments
+        FROM consignment_daily_rollup 
+        WHERE day >= CURRENT_DATE - $2::int
+        AND ($1::text IS NULL OR warehouse_id = $1)
+        GROUP BY day
+        HAVING SUM(consignment_count) > 0
         ORDER BY date DESC
         """
 
-        results = await db.fetch(query)
-        return [dict(row) for row in results]
\ No newline at end of file
+        results = await db.fetch(query, warehouse_id, days, name="dashboard_trends", replica=True)
+        return [dict(row) for row in results]
+
+    @staticmethod
+    async def get_overview(warehouse_id: Optional[str] = None, days: int = 30, limit: int = 10) -> Dict:
+        """Every dashboard panel in one call, queried concurrently on separate connections"""
+        # Cap how many pool connections one overview may hold at once
+        slots = asyncio.Semaphore(settings.dashboard_overview_concurrency)
+
+        async def _panel(coroutine):
+            async with slots:
+                return await coroutine
+
+        stats, by_status, activities, performance, trends = await asyncio.gather(
+            _panel(DashboardService.get_dashboard_stats(warehouse_id)),
+            _panel(DashboardService.get_consignments_by_status(warehouse_id, days)),
+            _panel(DashboardService.get_recent_activities(warehouse_id, limit)),
+            _panel(DashboardService.get_performance_metrics(warehouse_id, days)),
+            _panel(DashboardService.get_delivery_trends(warehouse_id, days))
+        )
+
+        return {
+            "stats": stats,
+            "consignments_by_status": by_status,
+            "recent_activities": activities,
+            "performance_metrics": performance,
+            "delivery_trends": trends
+        }
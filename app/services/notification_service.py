@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import asyncpg
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from app.config import settings
+from app.database import db, DatabaseOverloadedError
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANNEL = "consignment_status"
+
+# Cross-worker invalidation of in-process caches; payload {"cache": ..., **keys}
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+# NOTIFY for one logged status change; expects aliases log (the inserted
+# consignment_status_log row) and c (the consignment). Notes are trimmed to
+# stay well inside the 8000 byte payload limit. Delivered on commit.
+STATUS_NOTIFY = f"""
+pg_notify('{STATUS_CHANNEL}', json_build_object(
+    'consignment_id', log.consignment_id,
+    'tracking_number', c.tracking_number,
+    'warehouse_id', c.current_warehouse_id,
+    'from_status', log.from_status,
+    'to_status', log.to_status,
+    'notes', left(log.notes, 500),
+    'created_at', log.created_at
+)::text)
+"""
+
+# (filter, value) a subscriber listens on: ("warehouse", id), ("warehouse", None)
+# for every warehouse, or ("tracking", tracking_number) for a single parcel
+SubscriptionKey = Tuple[str, Optional[str]]
+
+
+class StatusFeed:
+    """One LISTEN connection per worker, fanning status events out to in-process subscribers.
+
+    Subscribers get the raw JSON payload from Postgres on a bounded queue; a
+    subscriber that falls behind loses events rather than holding memory.
+    The same connection carries cache invalidations between workers; while
+    it is reconnecting those are missed and the caches' TTLs bound staleness.
+    """
+
+    def __init__(self):
+        self._connection: Optional[asyncpg.Connection] = None
+        self._subscribers: Dict[SubscriptionKey, Set[asyncio.Queue]] = {}
+        self._event_handlers: List[Callable[[dict], None]] = []
+        self._invalidation_handlers: Dict[str, Callable[..., None]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def on_status_event(self, handler: Callable[[dict], None]):
+        """Call handler with every decoded status event (e.g. to drop cached lookups)"""
+        self._event_handlers.append(handler)
+
+    def on_invalidation(self, cache: str, handler: Callable[..., None]):
+        """Call handler(**keys) for every invalidation published for cache"""
+        self._invalidation_handlers[cache] = handler
+
+    def start(self):
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._disconnect()
+
+    async def _supervise(self):
+        """Keep the listener connected, re-subscribing after a dropped session"""
+        while True:
+            try:
+                if self._connection is None or self._connection.is_closed():
+                    await self._disconnect()
+                    self._connection = await asyncpg.connect(settings.database_url)
+                    await self._connection.add_listener(STATUS_CHANNEL, self._dispatch)
+                    await self._connection.add_listener(INVALIDATION_CHANNEL, self._invalidate)
+                    logger.info("Listening on %s", STATUS_CHANNEL)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as exc:
+                logger.warning("Status feed listener failed: %s", exc)
+                await self._disconnect()
+
+            await asyncio.sleep(settings.live_feed_reconnect_seconds)
+
+    async def _disconnect(self):
+        if self._connection is not None:
+            if not self._connection.is_closed():
+                await self._connection.close()
+            self._connection = None
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str):
+        event = json.loads(payload)
+
+        for handler in self._event_handlers:
+            handler(event)
+
+        # Staff subscribers get the full payload
+        for key in {("warehouse", None), ("warehouse", event.get("warehouse_id"))}:
+            self._publish(key, payload)
+
+        # Public tracking subscribers never see notes or internal ids
+        tracking_key = ("tracking", event.get("tracking_number"))
+        if tracking_key in self._subscribers:
+            self._publish(tracking_key, public_event(
+                event["tracking_number"], event["to_status"], event["created_at"]
+            ))
+
+    def _invalidate(self, connection, pid: int, channel: str, payload: str):
+        keys = json.loads(payload)
+        handler = self._invalidation_handlers.get(keys.pop("cache"))
+        if handler is not None:
+            handler(**keys)
+
+    def _publish(self, key: SubscriptionKey, payload: str):
+        for queue in self._subscribers.get(key, ()):
+            try:
+                queue.put_nowait(payload)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def tracking_subscribers(self) -> int:
+        """Open public tracking subscriptions in this worker"""
+        return sum(len(queues) for (kind, _), queues in self._subscribers.items() if kind == "tracking")
+
+    @contextmanager
+    def subscribe(self, key: SubscriptionKey) -> Iterator[asyncio.Queue]:
+        """Queue receiving every event matching key until the block exits"""
+        queue = asyncio.Queue(maxsize=settings.live_feed_queue_size)
+        self._subscribers.setdefault(key, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "connected": int(self._connection is not None and not self._connection.is_closed())
+        }
+
+
+async def publish_invalidation(cache: str, **keys):
+    """Ask every worker, this one included, to drop entries from an in-process cache.
+
+    Best effort: callers invalidate their own worker first and have already
+    committed the change, so a failed NOTIFY is logged and the other workers
+    fall back to the cache TTL, as when the listener misses one.
+    """
+    try:
+        await db.execute(
+            "SELECT pg_notify($1, $2)",
+            INVALIDATION_CHANNEL,
+            json.dumps({"cache": cache, **keys}),
+            name="cache_invalidation"
+        )
+    except (DatabaseOverloadedError, OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+        logger.warning("Could not publish %s invalidation: %s", cache, exc)
+
+
+def public_event(tracking_number: str, status: str, updated_at) -> str:
+    """Tracking event safe for unauthenticated subscribers"""
+    return json.dumps({"tracking_number": tracking_number, "status": status, "updated_at": updated_at})
+
+
+status_feed = StatusFeed()
+
+
+async def event_stream(
+        key: SubscriptionKey,
+        event: str = "status_change",
+        snapshot: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Server-Sent Events for one subscription, with keep-alive comments while idle"""
+    with status_feed.subscribe(key) as queue:
+        if snapshot is not None:
+            yield f"event: snapshot\ndata: {snapshot}\n\n"
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=settings.live_feed_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {payload}\n\n"
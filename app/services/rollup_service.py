@@ -0,0 +1,175 @@
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from app.database import db
+
+# (warehouse_id, created_at, status, consignment_count, delivered_count, delivery_seconds)
+RollupDelta = Tuple[str, datetime, str, int, int, float]
+
+# Upsert head/tail shared by every statement that folds deltas into the rollup
+ROLLUP_INSERT = """
+INSERT INTO consignment_daily_rollup AS r (
+    warehouse_id, day, status, consignment_count, delivered_count, delivery_seconds
+)
+"""
+
+ROLLUP_ON_CONFLICT = """
+ON CONFLICT (warehouse_id, day, status) DO UPDATE SET
+    consignment_count = r.consignment_count + EXCLUDED.consignment_count,
+    delivered_count = r.delivered_count + EXCLUDED.delivered_count,
+    delivery_seconds = r.delivery_seconds + EXCLUDED.delivery_seconds,
+    updated_at = NOW()
+"""
+
+
+class DashboardRollupService:
+    @staticmethod
+    def created_delta(row) -> RollupDelta:
+        """Delta for a newly inserted consignment row"""
+        return (row['current_warehouse_id'], row['created_at'], row['status'], 1, 0, 0.0)
+
+    @staticmethod
+    def removed_delta(row) -> RollupDelta:
+        """Delta for a consignment row leaving the live table"""
+        if row['status'] == 'delivered' and row['delivered_at']:
+            seconds = (row['delivered_at'] - row['created_at']).total_seconds()
+            return (row['current_warehouse_id'], row['created_at'], row['status'], -1, -1, -seconds)
+        return (row['current_warehouse_id'], row['created_at'], row['status'], -1, 0, 0.0)
+
+    @staticmethod
+    def status_deltas(row, from_status: str, from_delivered_at: Optional[datetime]) -> List[RollupDelta]:
+        """Deltas moving one consignment from its previous status to row['status']"""
+        warehouse_id = row['current_warehouse_id']
+        created_at = row['created_at']
+        deltas = []
+
+        if from_status == 'delivered' and from_delivered_at:
+            seconds = (from_delivered_at - created_at).total_seconds()
+            deltas.append((warehouse_id, created_at, from_status, -1, -1, -seconds))
+        else:
+            deltas.append((warehouse_id, created_at, from_status, -1, 0, 0.0))
+
+        if row['status'] == 'delivered' and row['delivered_at']:
+            seconds = (row['delivered_at'] - created_at).total_seconds()
+            deltas.append((warehouse_id, created_at, row['status'], 1, 1, seconds))
+        else:
+            deltas.append((warehouse_id, created_at, row['status'], 1, 0, 0.0))
+
+        return deltas
+
+    @staticmethod
+    async def apply(connection, deltas: List[RollupDelta]):
+        """Fold deltas into the rollup inside the caller's transaction"""
+        if not deltas:
+            return
+
+        query = ROLLUP_INSERT + """
+        SELECT
+            d.warehouse_id,
+            d.created_at::date,
+            d.status,
+            SUM(d.consignment_count),
+            SUM(d.delivered_count),
+            SUM(d.delivery_seconds)
+        FROM unnest($1::text[], $2::timestamptz[], $3::text[], $4::int[], $5::int[], $6::float8[])
+            AS d(warehouse_id, created_at, status, consignment_count, delivered_count, delivery_seconds)
+        GROUP BY 1, 2, 3
+        """ + ROLLUP_ON_CONFLICT
+
+        columns = list(zip(*deltas))
+        await connection.execute(query, *[list(column) for column in columns])
+
+    @staticmethod
+    async def subtract_table(connection, table: str):
+        """Remove every row of a table (e.g. a partition being archived) from the rollup"""
+        query = ROLLUP_INSERT + f"""
+        SELECT
+            current_warehouse_id,
+            created_at::date,
+            status,
+            -COUNT(*),
+            -COUNT(*) FILTER (WHERE status = 'delivered' AND delivered_at IS NOT NULL),
+            -COALESCE(SUM(EXTRACT(EPOCH FROM (delivered_at - created_at))) FILTER (
+                WHERE status = 'delivered' AND delivered_at IS NOT NULL
+            ), 0)
+        FROM "{table}"
+        GROUP BY 1, 2, 3
+        """ + ROLLUP_ON_CONFLICT
+        await connection.execute(query)
+
+    @staticmethod
+    async def rebuild(since: Optional[date] = None) -> int:
+        """Recompute the rollup from consignments, optionally only from a given day"""
+        async with db.transaction() as connection:
+            # Block incremental writers so no delta lands between delete and insert
+            await connection.execute("LOCK TABLE consignment_daily_rollup IN EXCLUSIVE MODE")
+
+            await connection.execute(
+                "DELETE FROM consignment_daily_rollup WHERE ($1::date IS NULL OR day >= $1)",
+                since
+            )
+
+            query = """
+            INSERT INTO consignment_daily_rollup (
+                warehouse_id, day, status, consignment_count, delivered_count, delivery_seconds
+            )
+            SELECT
+                current_warehouse_id,
+                created_at::date,
+                status,
+                COUNT(*),
+                COUNT(*) FILTER (WHERE status = 'delivered' AND delivered_at IS NOT NULL),
+                COALESCE(SUM(EXTRACT(EPOCH FROM (delivered_at - created_at))) FILTER (
+                    WHERE status = 'delivered' AND delivered_at IS NOT NULL
+                ), 0)
+            FROM consignments
+            WHERE ($1::date IS NULL OR created_at >= $1)
+            GROUP BY 1, 2, 3
+            """
+            result = await connection.execute(query, since)
+
+        return int(result.split()[-1])
+
+    @staticmethod
+    async def reconcile(days: int) -> int:
+        """Correct drift in the last `days` days of the rollup without blocking writers.
+
+        Truth and current rollup rows are read in one statement, so under READ
+        COMMITTED they share a snapshot; the ON CONFLICT adds only the
+        difference to the latest row, leaving concurrent deltas intact.
+        """
+        since = date.today() - timedelta(days=days)
+
+        query = ROLLUP_INSERT + """
+        SELECT
+            warehouse_id,
+            day,
+            status,
+            COALESCE(t.consignment_count, 0) - COALESCE(cur.consignment_count, 0),
+            COALESCE(t.delivered_count, 0) - COALESCE(cur.delivered_count, 0),
+            COALESCE(t.delivery_seconds, 0) - COALESCE(cur.delivery_seconds, 0)
+        FROM (
+            SELECT
+                current_warehouse_id as warehouse_id,
+                created_at::date as day,
+                status,
+                COUNT(*) as consignment_count,
+                COUNT(*) FILTER (WHERE status = 'delivered' AND delivered_at IS NOT NULL) as delivered_count,
+                COALESCE(SUM(EXTRACT(EPOCH FROM (delivered_at - created_at))) FILTER (
+                    WHERE status = 'delivered' AND delivered_at IS NOT NULL
+                ), 0) as delivery_seconds
+            FROM consignments
+            WHERE created_at >= $1::date
+            GROUP BY 1, 2, 3
+        ) t
+        FULL JOIN (
+            SELECT warehouse_id, day, status, consignment_count, delivered_count, delivery_seconds
+            FROM consignment_daily_rollup
+            WHERE day >= $1::date
+        ) cur USING (warehouse_id, day, status)
+        WHERE COALESCE(t.consignment_count, 0) <> COALESCE(cur.consignment_count, 0)
+        OR COALESCE(t.delivered_count, 0) <> COALESCE(cur.delivered_count, 0)
+        OR abs(COALESCE(t.delivery_seconds, 0) - COALESCE(cur.delivery_seconds, 0)) > 0.001
+        """ + ROLLUP_ON_CONFLICT
+
+        result = await db.execute(query, since, name="rollup_reconcile")
+        return int(result.split()[-1])
@@ -1,8 +1,9 @@
 from typing import List, Optional
-from app.database import db, supabase
+from app.database import db, supabase, run_supabase
 from app.models.user import UserCreate, UserUpdate, UserResponse
 from app.models.base import PaginatedResponse
-from app.core.auth import get_password_hash
+from app.core.auth import get_password_hash, invalidate_principal
+from app.services.notification_service import publish_invalidation
 from fastapi import HTTPException
 import uuid
 
@@ -13,7 +14,7 @@ class UserService:
         """Create a new user"""
         try:
             # Create user in Supabase Auth
-            auth_response = supabase.auth.admin.create_user({
+            auth_response = await run_supabase(supabase.auth.admin.create_user, {
                 "email": user.email,
                 "password": user.password,
                 "email_confirm": True
@@ -33,7 +34,7 @@ class UserService:
                 "is_active": True
             }
 
-            response = supabase.table("user_management").insert(user_data).execute()
+            response = await run_supabase(supabase.table("user_management").insert(user_data).execute)
 
             if response.data:
                 return UserResponse(**response.data[0])
@@ -47,7 +48,7 @@ class UserService:
     async def get_user(user_id: str) -> Optional[UserResponse]:
         """Get user by ID"""
         try:
-            response = supabase.table("user_management").select("*").eq("id", user_id).execute()
+            response = await run_supabase(supabase.table("user_management").select("*").eq("id", user_id).execute)
 
             if response.data:
                 return UserResponse(**response.data[0])
@@ -74,12 +75,12 @@ class UserService:
                 query = query.eq("role", role)
 
             # Get total count
-            count_response = query.execute()
+            count_response = await run_supabase(query.execute)
             total = count_response.count
 
             # Get paginated data
             offset = (page - 1) * page_size
-            data_response = query.range(offset, offset + page_size - 1).execute()
+            data_response = await run_supabase(query.range(offset, offset + page_size - 1).execute)
 
             users = [UserResponse(**user) for user in data_response.data]
 
@@ -100,7 +101,9 @@ class UserService:
             update_data = user.dict(exclude_unset=True)
 
             if update_data:
-                response = supabase.table("user_management").update(update_data).eq("id", user_id).execute()
+                response = await run_supabase(supabase.table("user_management").update(update_data).eq("id", user_id).execute)
+                invalidate_principal(user_id=user_id)
+                await publish_invalidation("principal", user_id=user_id)
 
                 if response.data:
                     return UserResponse(**response.data[0])
@@ -113,7 +116,9 @@ class UserService:
     async def delete_user(user_id: str) -> bool:
         """Soft delete user"""
         try:
-            response = supabase.table("user_management").update({"is_active": False}).eq("id", user_id).execute()
+            response = await run_supabase(supabase.table("user_management").update({"is_active": False}).eq("id", user_id).execute)
+            invalidate_principal(user_id=user_id)
+            await publish_invalidation("principal", user_id=user_id)
             return len(response.data) > 0
         except Exception as e:
             print(f"Error deleting user: {e}")
@@ -130,7 +135,9 @@ class UserService:
 
             # Toggle status
             new_status = not current_user.is_active
-            response = supabase.table("user_management").update({"is_active": new_status}).eq("id", user_id).execute()
+            response = await run_supabase(supabase.table("user_management").update({"is_active": new_status}).eq("id", user_id).execute)
+            invalidate_principal(user_id=user_id, email=current_user.email)
+            await publish_invalidation("principal", user_id=user_id, email=current_user.email)
 
             return len(response.data) > 0
         except Exception as e:
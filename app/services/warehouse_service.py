@@ -1,10 +1,12 @@
-from typing import List, Optional
-from app.database import db
+from typing import Dict, List, Optional
+from app.database import db, DatabaseOverloadedError
 from app.models.warehouse import WarehouseCreate, WarehouseUpdate, WarehouseResponse
-from app.models.base import PaginatedResponse
+from app.core.serialization import columns_for
 from fastapi import HTTPException
 import uuid
 
+WAREHOUSE_COLUMNS = columns_for(WarehouseResponse)
+
 
 class WarehouseService:
     @staticmethod
@@ -29,6 +31,9 @@ class WarehouseService:
                 warehouse.manager_id
             )
             return WarehouseResponse(**dict(result))
+        except DatabaseOverloadedError:
+            # Surfaced as 503 + Retry-After, not a client error
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error creating warehouse: {str(e)}")
 
@@ -43,32 +48,30 @@ class WarehouseService:
         return None
 
     @staticmethod
-    async def get_warehouses(page: int = 1, page_size: int = 20) -> PaginatedResponse:
-        """Get paginated list of warehouses"""
+    async def get_warehouses(page: int = 1, page_size: int = 20) -> Dict:
+        """Get paginated list of warehouses, as plain rows for RecordJSONResponse"""
         offset = (page - 1) * page_size
 
         # Get total count
         count_query = "SELECT COUNT(*) FROM warehouses WHERE is_active = true"
-        total = await db.fetchrow(count_query)
+        total = await db.fetchrow(count_query, replica=True)
 
         # Get warehouses
-        query = """
-        SELECT * FROM warehouses 
+        query = f"""
+        SELECT {WAREHOUSE_COLUMNS} FROM warehouses 
         WHERE is_active = true 
         ORDER BY created_at DESC 
         LIMIT $1 OFFSET $2
         """
-        results = await db.fetch(query, page_size, offset)
-
-        warehouses = [WarehouseResponse(**dict(row)) for row in results]
-
-        return PaginatedResponse(
-            items=warehouses,
-            total=total['count'],
-            page=page,
-            page_size=page_size,
-            total_pages=(total['count'] + page_size - 1) // page_size
-        )
+        results = await db.fetch(query, page_size, offset, replica=True)
+
+        return {
+            "items": [dict(row) for row in results],
+            "total": total['count'],
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total['count'] + page_size - 1) // page_size
+        }
 
     @staticmethod
     async def update_warehouse(warehouse_id: str, warehouse: WarehouseUpdate) -> Optional[WarehouseResponse]:
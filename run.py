@@ -1,11 +1,22 @@
+import importlib.util
 import uvicorn
 from app.config import settings
 
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
 if __name__ == "__main__":
+    # Debug keeps the single reloading process; otherwise one worker per core.
+    # The scheduler runs in whichever worker wins the advisory lock.
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.host,
+        port=settings.port,
         reload=settings.debug,
+        workers=1 if settings.debug else settings.web_workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
         log_level="info"
-    )
\ No newline at end of file
+    )
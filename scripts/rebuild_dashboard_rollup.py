@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+from datetime import date, timedelta
+from app.database import db
+from app.services.rollup_service import DashboardRollupService
+
+
+async def rebuild_rollup(days: int = None):
+    """Rebuild the dashboard rollup from the consignments table"""
+
+    await db.connect()
+
+    since = date.today() - timedelta(days=days) if days else None
+    rows = await DashboardRollupService.rebuild(since)
+
+    await db.disconnect()
+    scope = f"since {since}" if since else "in full"
+    print(f"Dashboard rollup rebuilt {scope}: {rows} buckets")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild / reconcile the dashboard rollup table")
+    parser.add_argument("--days", type=int, default=None, help="Only reconcile the last N days")
+    args = parser.parse_args()
+    asyncio.run(rebuild_rollup(args.days))
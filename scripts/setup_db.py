@@ -1,6 +1,9 @@
 import asyncio
 import asyncpg
 from app.config import settings
+from app.database import db
+from app.db.partitions import ensure_partitions
+from app.db.migrate import run_migrations
 
 
 async def setup_database():
@@ -8,20 +11,18 @@ async def setup_database():
 
     connection = await asyncpg.connect(settings.database_url)
 
-    # Read and execute migration files
-    migration_files = [
-        "app/db/migrations/001_initial_schema.sql",
-        "app/db/migrations/002_add_indexes.sql",
-        "app/db/migrations/003_add_triggers.sql"
-    ]
-
-    for file_path in migration_files:
-        print(f"Executing migration: {file_path}")
-        with open(file_path, 'r') as f:
-            migration_sql = f.read()
-            await connection.execute(migration_sql)
+    # Apply pending versioned migrations from app/db/migrations
+    applied = await run_migrations(connection)
+    print(f"Applied {len(applied)} migrations")
 
     await connection.close()
+
+    # Open partitions for the coming months
+    await db.connect()
+    created = await ensure_partitions()
+    await db.disconnect()
+    print(f"Created {created} future partitions")
+
     print("Database setup completed successfully!")
 
 